@@ -0,0 +1,46 @@
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+# Both make caches check back with us before reusing a response, which is a
+# cheap 304 when nothing changed. Shared caches may keep the public ones; the
+# route still authenticates every revalidation.
+PUBLIC_REVALIDATE = "public, no-cache"
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Strong ETag from the values that identify one version of a response.
+    """
+    raw = "\x1f".join(str(part) for part in parts)
+    return '"' + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    candidates = (value.strip().removeprefix("W/") for value in if_none_match.split(","))
+    return etag in candidates
+
+
+def conditional_get(
+    request: Request, response: Response, etag: str, *, cache_control: str
+) -> Response | None:
+    """
+    Answer 304 Not Modified if the client already has `etag`.
+
+    Otherwise the ETag and Cache-Control headers are set on `response` and
+    None is returned, so the route builds its body as usual. Call it before
+    running the route's queries, which is what makes a 304 cheap.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(
+            status_code=304, headers={"ETag": etag, "Cache-Control": cache_control}
+        )
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return None
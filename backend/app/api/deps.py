@@ -1,16 +1,21 @@
-from collections.abc import Generator
-from typing import Annotated
+import threading
+from collections.abc import AsyncGenerator, Generator
+from typing import Annotated, Any
 
 import jwt
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import async_engine, engine
 from app.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -24,12 +29,78 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    # nothing is expired on commit: an AsyncSession can't lazy load, so
+    # reading an expired attribute afterwards would fail
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
+# Authenticated users are cached by id as plain column values, so most
+# requests can build current_user without a SELECT. hashed_password is left
+# out; it loads lazily for the few routes that read it. The cache is per
+# process, so routes that change a user call invalidate_cached_user and the
+# TTL bounds how stale another worker's copy can be.
+_CACHED_USER_COLUMNS = [
+    attr.key for attr in inspect(User).column_attrs if attr.key != "hashed_password"
+]
+_user_cache: TTLCache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE, ttl=max(settings.USER_CACHE_TTL_SECONDS, 1)
+)
+_user_cache_lock = threading.Lock()
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
-    # print(session, token)
+
+def invalidate_cached_user(user_id: int | None) -> None:
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+
+def _cached_user(user_id: int) -> User | None:
+    if settings.USER_CACHE_TTL_SECONDS <= 0:
+        return None
+    with _user_cache_lock:
+        snapshot: dict[str, Any] | None = _user_cache.get(user_id)
+    if snapshot is None:
+        return None
+    # rebuild the row as if it had just been loaded; the caller attaches it
+    # to the request's session so routes can still modify and commit it
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def _cache_user(user: User | None) -> None:
+    if user and settings.USER_CACHE_TTL_SECONDS > 0:
+        snapshot = {key: getattr(user, key) for key in _CACHED_USER_COLUMNS}
+        with _user_cache_lock:
+            _user_cache[user.id] = snapshot
+
+
+def _load_user(session: Session, user_id: int) -> User | None:
+    user = _cached_user(user_id)
+    if user is None:
+        user = session.get(User, user_id)
+        _cache_user(user)
+    else:
+        session.add(user)
+    return user
+
+
+async def _aload_user(session: AsyncSession, user_id: int) -> User | None:
+    user = _cached_user(user_id)
+    if user is None:
+        user = await session.get(User, user_id)
+        _cache_user(user)
+    else:
+        session.add(user)
+    return user
+
+
+def _token_user_id(token: str) -> int:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -40,7 +111,16 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+    try:
+        return int(token_data.sub)
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+
+
+def _active_user(user: User | None) -> User:
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -48,7 +128,22 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
     return user
 
 
+def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    # print(session, token)
+    return _active_user(_load_user(session, _token_user_id(token)))
+
+
+async def aget_current_user(session: AsyncSessionDep, token: TokenDep) -> User:
+    """
+    get_current_user() for async routes, attached to their AsyncSession.
+    hashed_password isn't cached and can't lazy load there, so routes that
+    check passwords stay on CurrentUser.
+    """
+    return _active_user(await _aload_user(session, _token_user_id(token)))
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
+AsyncCurrentUser = Annotated[User, Depends(aget_current_user)]
 
 
 def get_current_active_superuser(current_user: CurrentUser) -> User:
@@ -0,0 +1,38 @@
+from typing import Annotated, Any
+
+from fastapi import HTTPException, Query
+
+from app.models import User, UserPublic
+
+USER_PUBLIC_FIELDS = list(UserPublic.model_fields)
+
+UserFields = Annotated[
+    str | None,
+    Query(
+        description="Comma-separated profile fields to return, e.g. "
+        "full_name,current_company,profile_image. Defaults to every public "
+        "field; id is always included.",
+    ),
+]
+
+
+def user_fields(fields: str | None) -> list[str]:
+    """
+    Validate a `fields=` parameter against the public user fields.
+    """
+    if not fields:
+        return USER_PUBLIC_FIELDS
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(requested) - set(USER_PUBLIC_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # keep the public field order, and id for the pagination cursor
+    return [name for name in USER_PUBLIC_FIELDS if name == "id" or name in requested]
+
+
+def user_columns(names: list[str]) -> list[Any]:
+    return [getattr(User, name) for name in names]
+
+
+def rows_as_dicts(rows: list[Any]) -> list[dict[str, Any]]:
+    return [row._asdict() for row in rows]
@@ -0,0 +1,72 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(*key: Any) -> str:
+    """
+    Encode the sort key of the last row on a page into an opaque cursor.
+    """
+    raw = json.dumps(list(key), separators=(",", ":"), default=_json_default)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    """
+    Decode a cursor made by encode_cursor, expecting a key of `size` values.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if not isinstance(key, list) or len(key) != size:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return key
+
+
+def decode_datetime_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a cursor made by encode_cursor from a (datetime, id) sort key.
+    """
+    moment, last_id = decode_cursor(cursor, 2)
+    if not isinstance(moment, str) or not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    try:
+        return datetime.fromisoformat(moment), last_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def paginate_by_id(statement: Any, id_column: Any, *, skip: int, limit: int, after: str | None) -> Any:
+    """
+    Order `statement` by `id_column` and page it.
+
+    With a cursor the page starts right after the last seen id, so it is an
+    index range scan no matter how deep it is; otherwise fall back to skip.
+    """
+    if after is not None:
+        (last_id,) = decode_cursor(after, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        statement = statement.where(id_column > last_id)
+    else:
+        statement = statement.offset(skip)
+    return statement.order_by(id_column).limit(limit)
+
+
+def next_id_cursor(rows: list[Any], limit: int) -> str | None:
+    if limit <= 0 or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last["id"] if isinstance(last, dict) else last.id)
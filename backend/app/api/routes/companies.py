@@ -1,14 +1,24 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import ValidationError
 from typing import Any
 from sqlmodel import func, select
 
+from app import crud
+from app.api.conditional import PUBLIC_REVALIDATE, conditional_get, make_etag
 from app.api.deps import CurrentUser, SessionDep
+from app.api.fields import UserFields, rows_as_dicts, user_columns, user_fields
+from app.api.pagination import next_id_cursor, paginate_by_id
+from app.api.streaming import stream_ndjson
+from app.core import cache
+from app.core.query_budget import query_budget
 from app.models import (
     Company, 
     CompaniesPublic, 
+    CompanyEmployeeCount,
     User, 
     UsersPublic, 
+    UsersProjected,
     Employment, 
     EmploymentsPublic,
     EmploymentCounts
@@ -17,66 +27,106 @@ from app.models import (
 router = APIRouter(prefix="/companies", tags=["companies"])
 
 @router.get("/", response_model=CompaniesPublic)
+@query_budget(3)
 def read_companies(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    request: Request,
+    response: Response,
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
 ):
     """
     retrieves companies
     """
-    count_statement = (
-            select(func.count())
-            .select_from(Company)
-        )
-    count = session.exec(count_statement).one()
+    version = crud.get_table_version(session=session, table_name="company")
+    etag = make_etag("companies", version, skip, limit)
+    not_modified = conditional_get(request, response, etag, cache_control=PUBLIC_REVALIDATE)
+    if not_modified:
+        return not_modified
+
+    def build() -> CompaniesPublic:
+        count_statement = (
+                select(func.count())
+                .select_from(Company)
+            )
+        count = session.exec(count_statement).one()
 
-    statement = select(Company).select_from(Company)
-    companies = session.exec(statement).all()
-    
-    return CompaniesPublic(data=companies, count=count)
+        statement = select(Company).order_by(Company.name).offset(skip).limit(limit)
+        companies = session.exec(statement).all()
+
+        return CompaniesPublic(data=companies, count=count)
+
+    return cache.cached_json_response("companies", ("list", version, skip, limit), build, response)
+
+
+@router.get("/export")
+def export_companies(current_user: CurrentUser):
+    """
+    streams every company as newline-delimited JSON
+    """
+    return stream_ndjson(select(Company.name, Company.image_url).order_by(Company.name))
 
 
 @router.get("/employee_counts", response_model=EmploymentsPublic)
+@query_budget(2)
 def read_employee_counts(
-    session: SessionDep, current_user: CurrentUser
+    request: Request, response: Response, session: SessionDep, current_user: CurrentUser
 ):
     """
     Get current employee counts for all companies, sorted by count in descending order.
     """
-    statement = (
-        select(
-            Company.name.label("company_name"),
-            func.count(User.id).label("employee_count")
+    version = crud.get_table_version(session=session, table_name="companyemployeecount")
+    etag = make_etag("employee_counts", version)
+    not_modified = conditional_get(request, response, etag, cache_control=PUBLIC_REVALIDATE)
+    if not_modified:
+        return not_modified
+
+    def build() -> EmploymentsPublic:
+        statement = select(CompanyEmployeeCount).order_by(
+            CompanyEmployeeCount.employee_count.desc(), CompanyEmployeeCount.company_name
         )
-        .select_from(Company)
-        .outerjoin(User, Company.name == User.current_company)
-        .group_by(Company.name)
-        .order_by(func.count(User.id).desc())
-    )
-    
-    results = session.exec(statement).all()
-    
-    counts = [
-        EmploymentCounts(company_name=row.company_name, employee_count=row.employee_count)
-        for row in results
-    ]
-    
-    return EmploymentsPublic(data=counts, count=len(counts))
+
+        results = session.exec(statement).all()
+
+        counts = [
+            EmploymentCounts(company_name=row.company_name, employee_count=row.employee_count)
+            for row in results
+        ]
+
+        return EmploymentsPublic(data=counts, count=len(counts))
+
+    return cache.cached_json_response("employee_counts", (version,), build, response)
 
 
 @router.get("/{name}", response_model=Company)
+@query_budget(2)
 def read_company(
-    name: str, session: SessionDep, current_user: CurrentUser
+    name: str,
+    request: Request,
+    response: Response,
+    session: SessionDep,
+    current_user: CurrentUser,
 ):
     """
     retrieves people who interned at company
     """
-    db_company = session.get(Company, name)
-    if not db_company:
-        raise HTTPException(
-            status_code=404,
-            detail="The company with this name does not exist in the system",
-        )
-    return db_company
+    version = crud.get_table_version(session=session, table_name="company")
+    etag = make_etag("company", version, name)
+    not_modified = conditional_get(request, response, etag, cache_control=PUBLIC_REVALIDATE)
+    if not_modified:
+        return not_modified
+
+    def build() -> Company:
+        db_company = session.get(Company, name)
+        if not db_company:
+            raise HTTPException(
+                status_code=404,
+                detail="The company with this name does not exist in the system",
+            )
+        return db_company
+
+    return cache.cached_json_response("companies", ("detail", version, name), build, response)
 
 
 @router.post("/", response_model=Company)
@@ -106,11 +156,15 @@ def create_company(
         )
 
     session.add(company)
+    session.flush()
+    crud.bump_table_version(session=session, table_name="company")
+    crud.add_company_employee_count(session=session, company_name=company.name)
     session.commit()
+    cache.invalidate("companies", "employee_counts")
     session.refresh(company)
     return company
 
-@router.get("/all_employees/{name}", response_model=UsersPublic)
+@router.get("/all_employees/{name}", response_model=UsersPublic, response_class=ORJSONResponse)
 def read_employees(
     name: str, session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
 ):
@@ -122,22 +176,30 @@ def read_employees(
             .select_from(Employment)
             .where(Employment.company_name == name)
         )
-    user_ids = session.exec(users_statement).all()
-    # count = len(user_ids)
 
+    # a subquery rather than a list of ids, a large company's list makes
+    # the planner scan the whole user table
     statement = select(User).select_from(User).where(
-        User.id.in_(user_ids)).offset(skip).limit(limit)
+        User.id.in_(users_statement)).offset(skip).limit(limit)
     users = session.exec(statement).all()
 
     return UsersPublic(data=users, count=0)
 
-@router.get("/current_employees/{name}", response_model=UsersPublic)
+@router.get("/current_employees/{name}", response_model=UsersProjected, response_class=ORJSONResponse)
+@query_budget(2)
 def read_current_employees(
-    name: str, session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    name: str,
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    fields: UserFields = None,
 ):
     """
     retrieves people who work at the company.
     """
+    names = user_fields(fields)
     count_statement = (
             select(func.count())
             .select_from(User)
@@ -145,8 +207,11 @@ def read_current_employees(
         )
     count = session.exec(count_statement).one()
 
-    statement = select(User).select_from(User).where(
-        User.current_company == name, User.id != current_user.id).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    statement = select(*user_columns(names)).where(
+        User.current_company == name, User.id != current_user.id)
+    statement = paginate_by_id(statement, User.id, skip=skip, limit=limit, after=after)
+    users = rows_as_dicts(session.exec(statement).all())
 
-    return UsersPublic(data=users, count=count)
\ No newline at end of file
+    return ORJSONResponse(
+        {"data": users, "count": count, "next_cursor": next_id_cursor(users, limit)}
+    )
\ No newline at end of file
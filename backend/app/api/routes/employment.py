@@ -1,9 +1,12 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import ValidationError
 from typing import Any
+from datetime import datetime, timezone
 from sqlmodel import func, select
 
-from app.api.deps import CurrentUser, SessionDep
+from app import crud
+from app.api.deps import CurrentUser, SessionDep, invalidate_cached_user
+from app.core import cache
 from sqlmodel import SQLModel, Field
 from app.models import (
     Company, 
@@ -29,10 +32,13 @@ def add_employment(
     try:
         # create the company if it doesn't exist
         company = session.get(Company, employment_in.company_name)
+        created_company = company is None
         if not company:
             company = Company(name=employment_in.company_name)
             session.add(company)
             session.flush()
+            crud.bump_table_version(session=session, table_name="company")
+            crud.add_company_employee_count(session=session, company_name=company.name)
 
         # create employment with validated company
         employment = Employment.model_validate({
@@ -49,10 +55,18 @@ def add_employment(
         if employment.end is None:
             user = session.get(User, current_user.id)
             if user:
+                crud.change_current_company(
+                    session=session, old=user.current_company, new=employment.company_name
+                )
                 user.current_company = employment.company_name
+                user.updated_at = datetime.now(timezone.utc)
                 session.add(user)
 
         session.commit()
+        invalidate_cached_user(current_user.id)
+        cache.invalidate("users", "employee_counts")
+        if created_company:
+            cache.invalidate("companies")
         session.refresh(employment)
         return employment
 
@@ -76,11 +90,15 @@ def delete_employment(id: int, session: SessionDep, current_user: CurrentUser):
 
     user = session.get(User, current_user.id)
     if user and user.current_company == employment.company_name:
+        crud.change_current_company(session=session, old=user.current_company, new=None)
         user.current_company = None
+        user.updated_at = datetime.now(timezone.utc)
         session.add(user)
 
     session.delete(employment)
     session.commit()
+    invalidate_cached_user(current_user.id)
+    cache.invalidate("users", "employee_counts")
     return employment
 
 @router.get("/", response_model=EmploymentsList)
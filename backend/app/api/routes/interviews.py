@@ -1,30 +1,96 @@
-from fastapi import APIRouter, HTTPException
+import io
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import ValidationError
-from typing import Any
-from sqlmodel import func, select
+from typing import Annotated, Any
+from sqlmodel import Session, func, insert, select, tuple_
 
+from app import crud
 from app.api.deps import CurrentUser, SessionDep
-from app.models import Interview, InterviewsPublic
+from app.api.pagination import decode_datetime_cursor, encode_cursor
+from app.api.streaming import stream_ndjson
+from app.core import cache
+from app.models import Interview, InterviewImportError, InterviewImportResult, InterviewsPublic
 
 router = APIRouter(prefix="/interviews", tags=["interviews"])
 
-@router.get("/", response_model=InterviewsPublic)
+
+def interview_filters(
+    company_name: str | None = None,
+    role: str | None = None,
+    internship: bool | None = None,
+    passed: bool | None = None,
+    season_from: datetime | None = None,
+    season_to: datetime | None = None,
+) -> list[Any]:
+    conditions = []
+    if company_name is not None:
+        conditions.append(Interview.company_name == company_name)
+    if role is not None:
+        conditions.append(Interview.role == role)
+    if internship is not None:
+        conditions.append(Interview.internship == internship)
+    if passed is not None:
+        conditions.append(Interview.passed == passed)
+    if season_from is not None:
+        conditions.append(Interview.season >= season_from)
+    if season_to is not None:
+        conditions.append(Interview.season <= season_to)
+    return conditions
+
+
+InterviewFilters = Annotated[list[Any], Depends(interview_filters)]
+
+
+@router.get("/", response_model=InterviewsPublic, response_class=ORJSONResponse)
 def read_interviews(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    filters: InterviewFilters,
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
 ):
     """
-    retrieves ALL interviews
+    retrieves interviews, newest season first. pass the returned next_cursor
+    as `after` to get the next page
     """
     count_statement = (
             select(func.count())
             .select_from(Interview)
+            .where(*filters)
         )
     count = session.exec(count_statement).one()
 
-    statement = select(Interview).select_from(Interview)
-    companies = session.exec(statement).all()
-    
-    return InterviewsPublic(data=companies, count=count)
+    statement = select(Interview).where(*filters)
+    if after is not None:
+        season, last_id = decode_datetime_cursor(after)
+        statement = statement.where(
+            tuple_(Interview.season, Interview.id) < tuple_(season, last_id)
+        )
+    else:
+        statement = statement.offset(skip)
+    statement = statement.order_by(Interview.season.desc(), Interview.id.desc()).limit(limit)
+    interviews = session.exec(statement).all()
+
+    next_cursor = None
+    if limit > 0 and len(interviews) == limit:
+        next_cursor = encode_cursor(interviews[-1].season, interviews[-1].id)
+    return InterviewsPublic(data=interviews, count=count, next_cursor=next_cursor)
+
+
+@router.get("/export")
+def export_interviews(current_user: CurrentUser, filters: InterviewFilters):
+    """
+    streams the matching interviews as newline-delimited JSON
+    """
+    statement = (
+        select(*Interview.__table__.columns)
+        .where(*filters)
+        .order_by(Interview.season.desc(), Interview.id.desc())
+    )
+    return stream_ndjson(statement)
 
 
 # @router.get("/{name}", response_model=Company)
@@ -73,23 +139,24 @@ def create_interviews(
     """
     Create multiple interviews from a list
     """
-    interviews = []
+    rows = []
     for interview_data in interviews_in.data:
         try:
             interview = Interview.model_validate(interview_data)
-            session.add(interview)
-            interviews.append(interview)
+            rows.append(interview.model_dump(exclude={"id"}))
         except ValidationError as e:
             raise HTTPException(
                 status_code=400,
                 detail=f"Validation error for interview data: {e.errors()}"
             )
 
-
+    created = crud.upsert_companies(
+        session=session, names=[row["company_name"] for row in rows]
+    )
+    interviews = _insert_interviews(session, rows, return_rows=True)
     session.commit()
-
-    for interview in interviews:
-        session.refresh(interview)
+    if created:
+        cache.invalidate("companies", "employee_counts")
 
     count_statement = (
         select(func.count())
@@ -97,4 +164,83 @@ def create_interviews(
     )
     count = session.exec(count_statement).one()
 
-    return InterviewsPublic(data=interviews, count=count)
\ No newline at end of file
+    return InterviewsPublic(data=interviews, count=count)
+
+
+@router.post("/import", response_model=InterviewImportResult)
+def import_interviews(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    rows: list[dict[str, Any]],
+    return_rows: bool = True,
+) -> Any:
+    """
+    Import a large batch of interviews. Invalid rows are reported by index
+    instead of failing the batch; the valid ones are inserted together.
+    With return_rows=false nothing is read back, which on Postgres allows
+    loading the rows with COPY.
+    """
+    valid_rows = []
+    errors = []
+    for index, row in enumerate(rows):
+        try:
+            interview = Interview.model_validate(row)
+        except ValidationError as e:
+            errors.append(
+                InterviewImportError(
+                    index=index, errors=e.errors(include_url=False, include_context=False)
+                )
+            )
+            continue
+        valid_rows.append(interview.model_dump(exclude={"id"}))
+
+    created = crud.upsert_companies(
+        session=session, names=[row["company_name"] for row in valid_rows]
+    )
+    interviews = _insert_interviews(session, valid_rows, return_rows=return_rows)
+    session.commit()
+    if created:
+        cache.invalidate("companies", "employee_counts")
+
+    return InterviewImportResult(data=interviews, inserted=len(valid_rows), errors=errors)
+
+
+_COPY_COLUMNS = ["user_id", "company_name", "role", "internship", "season", "passed", "note", "date"]
+
+
+def _copy_csv_line(values: list[Any]) -> str:
+    # COPY's CSV format reads only an unquoted empty field as NULL, so every
+    # value is quoted and any text, "" or \N included, arrives as itself
+    return ",".join(
+        "" if value is None else '"' + str(value).replace('"', '""') + '"' for value in values
+    ) + "\n"
+
+
+def _insert_interviews(
+    session: Session, rows: list[dict[str, Any]], *, return_rows: bool
+) -> list[dict[str, Any]]:
+    """
+    Insert validated interview rows as multi-row INSERTs (RETURNING the new
+    rows when asked for), or with COPY on Postgres when nothing is returned.
+    """
+    if not rows:
+        return []
+    if return_rows:
+        result = session.exec(
+            insert(Interview).returning(*Interview.__table__.columns), params=rows
+        )
+        return [row._asdict() for row in result]
+    if session.get_bind().dialect.name == "postgresql":
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(_copy_csv_line([row[name] for name in _COPY_COLUMNS]))
+        buffer.seek(0)
+        cursor = session.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY interview ({', '.join(_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    else:
+        session.exec(insert(Interview), params=rows)
+    return []
\ No newline at end of file
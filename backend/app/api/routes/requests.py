@@ -1,21 +1,32 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import ValidationError
 from typing import Any
-from sqlmodel import func, select
+from sqlmodel import case, func, literal, select, true, tuple_, union_all
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Request, RequestPublic, CompletedRequest, User, Email
-from app.utils import generate_connection_request_email, send_email, generate_connection_acceptance_email
+from app.api.deps import AsyncCurrentUser, AsyncSessionDep
+from app.api.pagination import decode_datetime_cursor, encode_cursor
+from app.core.graph import connection_graph
+from app.core.query_budget import query_budget
+from app.models import (
+    Request, RequestPublic, CompletedRequest, User, Email, ConnectionPublic, ConnectionsPublic,
+    NotificationPreference,
+    SecondDegreeConnection, SecondDegreeConnectionsPublic, UsersPublic
+)
+from app.outbox import enqueue_email, notify_outbox
+from app.utils import generate_connection_request_email, generate_connection_acceptance_email
 from datetime import datetime, timezone
 
 router = APIRouter(prefix="/connections", tags=["connections"])
 
 @router.post("/", response_model=Request)
+@query_budget(7)
 async def create_connection_request(
     request_create: RequestPublic,
-    session: SessionDep,
-    current_user: CurrentUser
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser
 ) -> Any:
     if request_create.requester_id != current_user.id:
         raise HTTPException(status_code=403, detail="You can only create requests for yourself.")
@@ -26,30 +37,33 @@ async def create_connection_request(
     statement = select(Request).where(
         Request.requester_id == request_create.requested_id,
         Request.requested_id == request_create.requester_id)
-    session_user = session.exec(statement).first()
+    session_user = (await session.exec(statement)).first()
     if session_user:
         raise HTTPException(
             status_code=400,
             detail="The user has already requested you",
         )
     
-    conn = Request.model_validate(request_create)
-    session.add(conn)
-    session.commit()
-    session.refresh(conn)
-    
     # get the requested user's information
-    requested_user = session.get(User, request_create.requested_id)
+    requested_user = await session.get(User, request_create.requested_id)
     if not requested_user:
         raise HTTPException(status_code=404, detail="Requested user not found")
-    
+
+    conn = Request.model_validate(request_create)
+    session.add(conn)
+    # flush so the request id is available for the email links
+    await session.flush()
+
     # get the requested user's preferred email
-    preferred_email = session.exec(
+    preferred_email = (await session.exec(
         select(Email).where(Email.user_id == requested_user.id, Email.preferred == True)
-    ).first()
+    )).first()
+    # users on the daily digest hear about this request from app.digest
+    preference = await session.get(NotificationPreference, requested_user.id)
+    immediate = preference is None or preference.connection_requests == "immediate"
     
-    if preferred_email and settings.emails_enabled:
-        # send email notification
+    if preferred_email and immediate and settings.emails_enabled:
+        # queue the email notification, it is committed with the request
         email_data = generate_connection_request_email(
             email_to=preferred_email.email,
             requested_name=requested_user.full_name or requested_user.email,
@@ -61,37 +75,172 @@ async def create_connection_request(
             request_id=conn.id,
             message=request_create.message
         )
-        send_email(
-            email_to=preferred_email.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content,
+        enqueue_email(
+            session=session, email_to=preferred_email.email, email_data=email_data
         )
+
+    await session.commit()
+    notify_outbox()
     
     return conn
 
+@router.get("/me", response_model=ConnectionsPublic, response_class=ORJSONResponse)
+@query_budget(1)
+async def read_my_connections(
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    limit: int = 50,
+    after: str | None = None,
+) -> Any:
+    """
+    the current user's connections in both directions, newest first, one row
+    per peer. pass the returned next_cursor as `after` to get the next page
+    """
+    sent = select(
+        CompletedRequest.id,
+        CompletedRequest.created_at,
+        CompletedRequest.requested_id.label("peer_id"),
+        literal("sent").label("direction"),
+    ).where(CompletedRequest.requester_id == current_user.id)
+    received = select(
+        CompletedRequest.id,
+        CompletedRequest.created_at,
+        CompletedRequest.requester_id.label("peer_id"),
+        literal("received").label("direction"),
+    ).where(CompletedRequest.requested_id == current_user.id)
+    edges = union_all(sent, received).subquery("edges")
+
+    # keep the newest connection with each peer
+    ranked = select(
+        edges,
+        func.row_number().over(
+            partition_by=edges.c.peer_id,
+            order_by=(edges.c.created_at.desc(), edges.c.id.desc()),
+        ).label("position"),
+    ).subquery("ranked")
+    network = select(
+        ranked.c.id, ranked.c.created_at, ranked.c.peer_id, ranked.c.direction
+    ).where(ranked.c.position == 1).cte("network")
+    # one row of totals over the whole network, whatever page is asked for
+    totals = select(
+        func.count().label("total"),
+        func.coalesce(func.sum(case((network.c.direction == "sent", 1), else_=0)), 0).label("sent"),
+    ).select_from(network).subquery("totals")
+
+    # the page is outer joined to the totals, so an empty page still comes
+    # back as one row carrying them
+    on_page = true()
+    if after is not None:
+        created_at, last_id = decode_datetime_cursor(after)
+        on_page = tuple_(network.c.created_at, network.c.id) < tuple_(created_at, last_id)
+    statement = (
+        select(totals.c.total, totals.c.sent, network, User)
+        .select_from(totals)
+        .outerjoin(network.join(User, User.id == network.c.peer_id), on_page)
+        .order_by(network.c.created_at.desc(), network.c.id.desc())
+        # one extra row tells whether there is a next page
+        .limit(max(limit, 0) + 1)
+    )
+    rows = (await session.exec(statement)).all()
+
+    count = rows[0].total
+    sent_count = rows[0].sent
+    rows = [row for row in rows if row.id is not None]
+    next_cursor = None
+    if limit > 0 and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return ConnectionsPublic(
+        data=[
+            ConnectionPublic(
+                id=row.id, created_at=row.created_at, direction=row.direction, user=row.User
+            )
+            for row in rows[:max(limit, 0)]
+        ],
+        count=count,
+        sent=sent_count,
+        received=count - sent_count,
+        next_cursor=next_cursor,
+    )
+
+async def _users_by_id(session: AsyncSession, user_ids: list[int], *, visible_only: bool) -> dict[int, User]:
+    if not user_ids:
+        return {}
+    statement = select(User).where(User.id.in_(user_ids))
+    if visible_only:
+        statement = statement.where(User.profile_visible == True)
+    return {user.id: user for user in (await session.exec(statement)).all()}
+
+@router.get("/mutual/{user_id}", response_model=UsersPublic)
+@query_budget(2)
+async def mutual_connections(
+    user_id: int,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+) -> Any:
+    """
+    people connected to both the current user and `user_id`
+    """
+    await connection_graph.ensure_loaded(session)
+    mutual_ids = connection_graph.mutual(current_user.id, user_id)
+    page = mutual_ids[skip:skip + limit]
+    users = await _users_by_id(session, page, visible_only=False)
+    return UsersPublic(
+        data=[users[mutual_id] for mutual_id in page if mutual_id in users],
+        count=len(mutual_ids),
+    )
+
+@router.get("/second_degree", response_model=SecondDegreeConnectionsPublic)
+@query_budget(2)
+async def second_degree_connections(
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    skip: int = 0,
+    limit: int = 50,
+) -> Any:
+    """
+    people the current user isn't connected with but one of their connections
+    is, ranked by how many connections they share
+    """
+    await connection_graph.ensure_loaded(session)
+    count, candidates = connection_graph.second_degree(current_user.id, skip + limit)
+    page = candidates[skip:]
+    users = await _users_by_id(session, [candidate_id for candidate_id, _ in page], visible_only=True)
+    return SecondDegreeConnectionsPublic(
+        data=[
+            SecondDegreeConnection(user=users[candidate_id], mutual_count=mutual_count)
+            for candidate_id, mutual_count in page
+            if candidate_id in users
+        ],
+        count=count,
+    )
+
 @router.delete("/{connection_id}")
 async def delete_connection_request(
     connection_id: int,
-    session: SessionDep,
-    current_user: CurrentUser
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser
 ) -> Any:
-    connection_request = session.get(Request, connection_id)
+    connection_request = await session.get(Request, connection_id)
     if not connection_request:
         raise HTTPException(status_code=404, detail="Connection request not found.")
     if connection_request.requester_id != current_user.id:
         raise HTTPException(status_code=403, detail="You can only delete requests you created.")
     
-    session.delete(connection_request)
-    session.commit()
+    await session.delete(connection_request)
+    await session.commit()
     return {"detail": "Connection request deleted successfully."}
 
 @router.post("/accept/{request_id}")
+@query_budget(7)
 async def accept_request(
     request_id: int,
-    session: SessionDep,
-    current_user: CurrentUser
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser
 ) -> Any:
-    connection_request = session.get(Request, request_id)
+    connection_request = await session.get(Request, request_id)
     if not connection_request:
         raise HTTPException(status_code=404, detail="Connection request not found.")
     if connection_request.requested_id != current_user.id:
@@ -105,22 +254,25 @@ async def accept_request(
     session.add(conn)
     
     # get requester's information for the acceptance email
-    requester = session.get(User, connection_request.requester_id)
+    requester = await session.get(User, connection_request.requester_id)
     if not requester:
         raise HTTPException(status_code=404, detail="Requester not found")
     
-    # get requester's preferred email
-    requester_email = session.exec(
-        select(Email).where(Email.user_id == requester.id, Email.preferred == True)
-    ).first()
-    
-    # get current user's preferred contact info
-    preferred_email = session.exec(
-        select(Email).where(Email.user_id == current_user.id, Email.preferred == True)
-    ).first()
+    # get the requester's preferred email and the current user's preferred
+    # contact info together
+    preferred_emails = {
+        email.user_id: email
+        for email in (await session.exec(
+            select(Email).where(
+                Email.user_id.in_([requester.id, current_user.id]), Email.preferred == True
+            )
+        )).all()
+    }
+    requester_email = preferred_emails.get(requester.id)
+    preferred_email = preferred_emails.get(current_user.id)
     
     if requester_email and settings.emails_enabled:
-        # send acceptance email to requester
+        # queue acceptance email to requester
         email_data = generate_connection_acceptance_email(
             email_to=requester_email.email,
             requester_name=requester.full_name or requester.email,
@@ -128,40 +280,40 @@ async def accept_request(
             contact_email=preferred_email.email if preferred_email else None,
             linkedin_url=current_user.linkedin_url
         )
-        send_email(
-            email_to=requester_email.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content,
+        enqueue_email(
+            session=session, email_to=requester_email.email, email_data=email_data
         )
     
     # Delete the original request
-    session.delete(connection_request)
-    session.commit()
-    session.refresh(conn)
+    await session.delete(connection_request)
+    await session.commit()
+    connection_graph.add_edge(conn.requester_id, conn.requested_id)
+    notify_outbox()
     
     return conn
 
 @router.post("/ignore/{request_id}")
+@query_budget(2)
 async def ignore_request(
     request_id: int,
-    session: SessionDep,
-    current_user: CurrentUser
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser
 ) -> Any:
-    connection_request = session.get(Request, request_id)
+    connection_request = await session.get(Request, request_id)
     if not connection_request:
         raise HTTPException(status_code=404, detail="Connection request not found.")
     if connection_request.requested_id != current_user.id:
         raise HTTPException(status_code=403, detail="You can only ignore requests for yourself.")
     
-    session.delete(connection_request)
-    session.commit()
+    await session.delete(connection_request)
+    await session.commit()
     return {"detail": "Connection request ignored successfully."}
 
 @router.get("/{user_id}/accepted_requests")
 async def accepted_requests(
     user_id: int,
-    session: SessionDep,
-    current_user: CurrentUser
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser
 ) -> Any:
     if user_id != current_user.id:
         raise HTTPException(status_code=403, detail="You can only view your own connections.")
@@ -169,14 +321,14 @@ async def accepted_requests(
     statement = select(CompletedRequest).where(
         CompletedRequest.requester_id == user_id
     )
-    connections = session.exec(statement).all()
+    connections = (await session.exec(statement)).all()
     return connections
 
 @router.get("/{user_id}/accepted_requested")
 async def accepted_requested(
     user_id: int,
-    session: SessionDep,
-    current_user: CurrentUser
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser
 ) -> Any:
     if user_id != current_user.id:
         raise HTTPException(status_code=403, detail="You can only view your own connections.")
@@ -184,5 +336,5 @@ async def accepted_requested(
     statement = select(CompletedRequest).where(
         CompletedRequest.requested_id == user_id
     )
-    connections = session.exec(statement).all()
+    connections = (await session.exec(statement)).all()
     return connections
\ No newline at end of file
@@ -1,21 +1,33 @@
+from datetime import datetime, timezone
 from typing import Any
-from fastapi import APIRouter, Depends, HTTPException
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from sqlmodel import col, delete, func, select
 
 from app import crud
+from app.api.conditional import PRIVATE_REVALIDATE, conditional_get, make_etag
+from app.api.fields import UserFields, rows_as_dicts, user_columns, user_fields
 from app.api.deps import (
     CurrentUser,
     SessionDep,
-    get_current_active_superuser
+    get_current_active_superuser,
+    invalidate_cached_user
 )
+from app.api.pagination import next_id_cursor, paginate_by_id
+from app.core import cache, search
 from app.core.config import settings
+from app.core.query_budget import query_budget
 from app.core.security import get_password_hash, verify_password
 from app.models import (
     Message,
+    NotificationPreference,
+    NotificationPreferencePublic,
     User,
     UserCreate,
     UserPublic,
-    UsersPublic,
+    UsersProjected,
+    UserSearchResults,
     UserRegister,
     UserUpdate,
     UserUpdateMe,
@@ -30,22 +42,83 @@ router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get(
     "/",
-    response_model=UsersPublic
+    response_model=UsersProjected,
+    response_class=ORJSONResponse
 )
-def read_users(session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100) -> Any:
+@query_budget(2)
+def read_users(
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    fields: UserFields = None,
+) -> Any:
     """
-    retrieve users
+    retrieve users, pass the returned next_cursor as `after` to get the next page
     """
     # print("read")
-
-    count_statement = select(func.count()).select_from(User).where(User.id != current_user.id)
-    count = session.exec(count_statement).one()
-
-    statement = select(User).where(
-        User.profile_visible == True, User.id != current_user.id).offset(skip).limit(limit)
-    users = session.exec(statement).all()
-
-    return UsersPublic(data=users, count=count)
+    names = user_fields(fields)
+
+    # The cached page is shared by every viewer, so it is built without
+    # excluding anyone and with one extra row; the viewer is dropped below.
+    def build() -> bytes:
+        count = session.exec(select(func.count()).select_from(User)).one()
+        statement = select(*user_columns(names)).where(User.profile_visible == True)
+        statement = paginate_by_id(statement, User.id, skip=skip, limit=limit + 1, after=after)
+        return orjson.dumps({"data": rows_as_dicts(session.exec(statement).all()), "count": count})
+
+    shared = orjson.loads(
+        cache.cached_bytes("users", ("directory", skip, limit, after, ",".join(names)), build)
+    )
+
+    users = shared["data"]
+    if any(user["id"] == current_user.id for user in users):
+        users = [user for user in users if user["id"] != current_user.id]
+    elif after is None and current_user.profile_visible and users and current_user.id < users[0]["id"]:
+        # the viewer was one of the skipped rows, so without them the page
+        # starts one row later
+        users = users[1:]
+    users = users[:limit]
+
+    return ORJSONResponse({
+        "data": users, "count": shared["count"] - 1, "next_cursor": next_id_cursor(users, limit)
+    })
+
+
+@router.get("/search", response_model=UserSearchResults, response_class=ORJSONResponse)
+@query_budget(2)
+def search_users(
+    session: SessionDep,
+    current_user: CurrentUser,
+    q: str | None = None,
+    graduation_year: int | None = None,
+    is_alumni: bool | None = None,
+    open_to_mentorship: bool | None = None,
+    open_to_coffee_chats: bool | None = None,
+    available_for_referrals: bool | None = None,
+    skip: int = 0,
+    limit: int = 20,
+) -> Any:
+    """
+    Full-text search over name, bio, role, company and location, with facet
+    counts for the filterable profile fields.
+    """
+    users, count, facets = search.search_users(
+        session=session,
+        q=q,
+        exclude_user_id=current_user.id,
+        filters={
+            "graduation_year": graduation_year,
+            "is_alumni": is_alumni,
+            "open_to_mentorship": open_to_mentorship,
+            "open_to_coffee_chats": open_to_coffee_chats,
+            "available_for_referrals": available_for_referrals,
+        },
+        skip=skip,
+        limit=limit,
+    )
+    return UserSearchResults(data=users, count=count, facets=facets)
 
 
 @router.post(
@@ -79,9 +152,11 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     session.add(new_email)
     session.commit()
     session.refresh(new_email)
+    cache.invalidate("users")
     return user
 
 @router.patch("/me", response_model=UserPublic)
+@query_budget(6)
 def update_user_me(
     *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
 ) -> Any:
@@ -96,9 +171,15 @@ def update_user_me(
                 status_code=409, detail="User with this email already exists"
             )
     user_data = user_in.model_dump(exclude_unset=True)
-    current_user.sqlmodel_update(user_data)
+    old_company = current_user.current_company
+    current_user.sqlmodel_update(user_data, update={"updated_at": datetime.now(timezone.utc)})
+    crud.change_current_company(
+        session=session, old=old_company, new=current_user.current_company
+    )
     session.add(current_user)
     session.commit()
+    invalidate_cached_user(current_user.id)
+    cache.invalidate("users", "employee_counts")
     session.refresh(current_user)
     return current_user
 
@@ -120,14 +201,49 @@ def update_password_me(
     current_user.hashed_password = hashed_password
     session.add(current_user)
     session.commit()
+    invalidate_cached_user(current_user.id)
     return Message(message="Password updated successfully")
 
 
+@router.get("/me/notifications", response_model=NotificationPreferencePublic)
+def read_notification_preferences(session: SessionDep, current_user: CurrentUser) -> Any:
+    """
+    Get own notification settings.
+    """
+    preference = session.get(NotificationPreference, current_user.id)
+    return preference or NotificationPreferencePublic()
+
+
+@router.patch("/me/notifications", response_model=NotificationPreferencePublic)
+def update_notification_preferences(
+    *, session: SessionDep, body: NotificationPreferencePublic, current_user: CurrentUser
+) -> Any:
+    """
+    Choose between an email per connection request and a daily digest.
+    """
+    preference = session.get(NotificationPreference, current_user.id)
+    if not preference:
+        preference = NotificationPreference(user_id=current_user.id)
+    if body.connection_requests == "daily" and preference.connection_requests != "daily":
+        # requests until now were already emailed one by one
+        preference.last_digest_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    preference.connection_requests = body.connection_requests
+    session.add(preference)
+    session.commit()
+    session.refresh(preference)
+    return preference
+
+
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+def read_user_me(request: Request, response: Response, current_user: CurrentUser) -> Any:
     """
     Get current user.
     """
+    # every profile change sets updated_at, so it versions the response
+    etag = make_etag("user", current_user.id, current_user.updated_at.isoformat())
+    not_modified = conditional_get(request, response, etag, cache_control=PRIVATE_REVALIDATE)
+    if not_modified:
+        return not_modified
     return current_user
 
 
@@ -140,8 +256,13 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
+    user_id = current_user.id
+    crud.change_current_company(session=session, old=current_user.current_company, new=None)
+    session.exec(delete(NotificationPreference).where(NotificationPreference.user_id == user_id))
     session.delete(current_user)
     session.commit()
+    invalidate_cached_user(user_id)
+    cache.invalidate("users", "employee_counts")
     return Message(message="User deleted successfully")
 
 
@@ -164,6 +285,7 @@ def register_user(session: SessionDep, user_in: UserRegister) -> Any:
     session.add(new_email)
     session.commit()
     session.refresh(new_email)
+    cache.invalidate("users")
     return user
 
 
@@ -219,6 +341,8 @@ def update_user(
             )
 
     db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    invalidate_cached_user(user_id)
+    cache.invalidate("users", "employee_counts")
     return db_user
 
 
@@ -236,18 +360,30 @@ def delete_user(
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
+    crud.change_current_company(session=session, old=user.current_company, new=None)
+    session.exec(delete(NotificationPreference).where(NotificationPreference.user_id == user_id))
     session.delete(user)
     session.commit()
+    invalidate_cached_user(user_id)
+    cache.invalidate("users", "employee_counts")
     return Message(message="User deleted successfully")
 
 
-@router.get("/company/{company_name}")
+@router.get("/company/{company_name}", response_model=UsersProjected, response_class=ORJSONResponse)
+@query_budget(2)
 def get_users_by_company(
-    company_name: str, current_user: CurrentUser, session: SessionDep, skip: int = 0, limit: int = 100
+    company_name: str,
+    current_user: CurrentUser,
+    session: SessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    fields: UserFields = None,
 ) -> Any:
     """
     Get users by company
     """
+    names = user_fields(fields)
     count_statement = (
             select(func.count())
             .select_from(User)
@@ -255,8 +391,11 @@ def get_users_by_company(
         )
     count = session.exec(count_statement).one()
 
-    statement = select(User).select_from(User).where(
-        User.current_company == company_name, User.id != current_user.id).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    statement = select(*user_columns(names)).where(
+        User.current_company == company_name, User.id != current_user.id)
+    statement = paginate_by_id(statement, User.id, skip=skip, limit=limit, after=after)
+    users = rows_as_dicts(session.exec(statement).all())
 
-    return UsersPublic(data=users, count=count)
\ No newline at end of file
+    return ORJSONResponse(
+        {"data": users, "count": count, "next_cursor": next_id_cursor(users, limit)}
+    )
\ No newline at end of file
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_superuser
+from app.api.deps import SessionDep, TokenDep, get_current_active_superuser, get_current_user
+from app.core.config import settings
+from app.core.db import pool_status
+from app.core.metrics import render_prometheus
 from app.models import Message
 from app.utils import send_email
 
@@ -12,4 +18,24 @@ router = APIRouter(prefix="/utils", tags=["utils"])
 
 @router.get("/health-check/")
 async def health_check() -> bool:
-    return True
\ No newline at end of file
+    return True
+
+
+@router.get("/db-pool/", dependencies=[Depends(get_current_active_superuser)])
+def db_pool_status() -> dict[str, int]:
+    """
+    Connection pool statistics for this worker.
+    """
+    return pool_status()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(session: SessionDep, token: TokenDep) -> PlainTextResponse:
+    """
+    Request, database and hashing metrics for this worker in the Prometheus
+    text format. Authenticate with METRICS_TOKEN or as a superuser.
+    """
+    if not (settings.METRICS_TOKEN and secrets.compare_digest(token, settings.METRICS_TOKEN)):
+        if not get_current_user(session=session, token=token).is_superuser:
+            raise HTTPException(status_code=403, detail="The user doesn't have enough privileges")
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
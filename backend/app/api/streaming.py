@@ -0,0 +1,36 @@
+import json
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any
+
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from app.core.db import engine
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def stream_ndjson(statement: Any, batch_size: int = 1000) -> StreamingResponse:
+    """
+    Stream the rows of a column select as newline-delimited JSON.
+
+    Rows are fetched through a server-side cursor `batch_size` at a time and
+    written straight out as dicts, so neither ORM objects nor response models
+    are built and memory stays flat however many rows there are. The session
+    belongs to the generator because request dependencies are closed before
+    a streaming body is sent.
+    """
+    def lines() -> Iterator[str]:
+        with Session(engine) as session:
+            result = session.exec(statement.execution_options(yield_per=batch_size))
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps(row._asdict(), default=_json_default) + "\n" for row in rows
+                )
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,174 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+
+class CacheBackend(ABC):
+    """
+    Storage for cached response bodies.
+
+    Values are bytes with a TTL, and every namespace has a generation counter.
+    Entries are stored under the generation they were built in, so bumping it
+    drops a whole namespace at once without having to find its keys. A shared
+    backend (e.g. Redis: GET, SET EX, INCR) only has to provide these calls.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    def generation(self, namespace: str) -> int:
+        ...
+
+    @abstractmethod
+    def bump_generation(self, namespace: str) -> None:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Per-process LRU with a TTL per entry. Other workers keep their own copies,
+    so their entries can outlive an invalidation by up to the TTL.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        # kept outside the LRU, an evicted counter would bring old entries back
+        self._generations: dict[str, int] = {}
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace: str) -> int:
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def bump_generation(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache shared by every worker.
+    """
+
+    def __init__(self, url: str) -> None:
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> bytes | None:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._client.set(key, value, ex=ttl)
+
+    def generation(self, namespace: str) -> int:
+        return int(self._client.get(f"generation:{namespace}") or 0)
+
+    def bump_generation(self, namespace: str) -> None:
+        self._client.incr(f"generation:{namespace}")
+
+
+_backend: CacheBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def get_cache_backend() -> CacheBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if settings.RESPONSE_CACHE_URL:
+                _backend = RedisCacheBackend(settings.RESPONSE_CACHE_URL)
+            else:
+                _backend = MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+        return _backend
+
+
+def set_cache_backend(backend: CacheBackend) -> None:
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _key(backend: CacheBackend, namespace: str, parts: tuple[Any, ...]) -> str:
+    generation = backend.generation(namespace)
+    return ":".join(["response", namespace, str(generation), *(str(part) for part in parts)])
+
+
+def cached_bytes(namespace: str, parts: tuple[Any, ...], build: Callable[[], bytes]) -> bytes:
+    """
+    Return the cached value for `parts` in `namespace`, or build and store it.
+    """
+    if settings.RESPONSE_CACHE_TTL_SECONDS <= 0:
+        return build()
+    backend = get_cache_backend()
+    key = _key(backend, namespace, parts)
+    value = backend.get(key)
+    if value is None:
+        value = build()
+        backend.set(key, value, settings.RESPONSE_CACHE_TTL_SECONDS)
+    return value
+
+
+def cached_json_response(
+    namespace: str,
+    parts: tuple[Any, ...],
+    build: Callable[[], BaseModel],
+    response: Response | None = None,
+) -> Response:
+    """
+    Serve the JSON of the model `build` returns from the cache. `build` must
+    return the route's response_model, since the cached body skips FastAPI's
+    own serialization. Headers already set on the route's `response`
+    parameter are copied over, FastAPI drops them when a Response is returned.
+
+    Routes that send an ETag put the version it was made from in `parts`, so
+    the body always matches the ETag it is sent with, even in the window
+    between a write's commit and its invalidate().
+    """
+    body = cached_bytes(namespace, parts, lambda: build().model_dump_json().encode())
+    cached = Response(content=body, media_type="application/json")
+    if response is not None:
+        for name, value in response.headers.items():
+            if name != "content-length":
+                cached.headers[name] = value
+    return cached
+
+
+def invalidate(*namespaces: str) -> None:
+    backend = get_cache_backend()
+    for namespace in namespaces:
+        backend.bump_generation(namespace)
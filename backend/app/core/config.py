@@ -68,6 +68,16 @@ class Settings(BaseSettings):
             return self.DATABASE_URL
         return self.SQLITE_DB
 
+    # connection pool, unset values get a per-database default in app.core.db
+    DB_POOL_SIZE: int | None = None
+    DB_MAX_OVERFLOW: int | None = None
+    DB_POOL_RECYCLE_SECONDS: int | None = None
+    DB_POOL_PRE_PING: bool | None = None
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    # Postgres only, 0 means no limit
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    SQLITE_BUSY_TIMEOUT_SECONDS: float = 15.0
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -85,6 +95,79 @@ class Settings(BaseSettings):
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
 
+    # Routes declare how many statements they should need with
+    # @query_budget(n). Strict mode raises when one goes over, for tests and
+    # staging; otherwise it is logged. A statement repeated this many times in
+    # one budget is logged as a probable N+1.
+    QUERY_BUDGET_STRICT: bool = False
+    QUERY_BUDGET_REPEAT_THRESHOLD: int = 3
+
+    # bearer token Prometheus must send to read /utils/metrics; without one
+    # the endpoint is only open to superusers
+    METRICS_TOKEN: str | None = None
+
+    # bcrypt runs in a process pool; 0 workers hashes inline on the caller
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 1
+    # hashing jobs allowed in the pool at once, counted separately for async
+    # and sync callers; extra callers queue up
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 64
+
+    # authenticated users cached by get_current_user, 0 seconds disables it
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10_000
+
+    # cached JSON bodies of the company and directory routes, 0 seconds
+    # disables it. Set RESPONSE_CACHE_URL (redis://...) to share the cache
+    # between workers, otherwise each process keeps its own.
+    RESPONSE_CACHE_TTL_SECONDS: int = 30
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_URL: str | None = None
+
+    # the in-memory connection graph is reloaded from the database this often
+    # to pick up connections accepted by other workers
+    CONNECTION_GRAPH_RELOAD_SECONDS: int = 300
+
+    # uvicorn worker processes (uvicorn reads the same variable for --workers).
+    # The user cache, the in-memory response cache, the connection graph and
+    # /utils/metrics all live in one process, so with more than one worker the
+    # user cache is turned off, the response cache is turned off unless
+    # RESPONSE_CACHE_URL shares it, and the CPU count is split between the
+    # workers' bcrypt pools. The graph can then lag a connection accepted on
+    # another worker by up to CONNECTION_GRAPH_RELOAD_SECONDS, and a metrics
+    # scrape only sees the worker that answered it.
+    WEB_CONCURRENCY: int = 1
+
+    @model_validator(mode="after")
+    def _limit_per_process_state(self) -> Self:
+        if self.WEB_CONCURRENCY <= 1:
+            return self
+        self.USER_CACHE_TTL_SECONDS = 0
+        if not self.RESPONSE_CACHE_URL:
+            self.RESPONSE_CACHE_TTL_SECONDS = 0
+        if "PASSWORD_HASH_WORKERS" not in self.model_fields_set:
+            self.PASSWORD_HASH_WORKERS = max(
+                (os.cpu_count() or 1) // self.WEB_CONCURRENCY, 1
+            )
+        return self
+
+    # Outgoing mail is queued in the emailoutbox table and delivered by a pool
+    # of background workers, so request handlers never wait on SMTP.
+    EMAIL_OUTBOX_WORKERS: int = 2
+    EMAIL_OUTBOX_BATCH_SIZE: int = 20
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5.0
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 6
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: int = 30
+    # a row stuck in "sending" this long is assumed to belong to a dead worker
+    EMAIL_OUTBOX_CLAIM_TIMEOUT_SECONDS: int = 300
+
+    # Daily connection request digests (app.digest). Run them from cron with
+    # `python -m app.digest`, or set DIGEST_HOUR_UTC to have every web worker
+    # schedule them; a recipient is claimed before sending, so only one does.
+    DIGEST_HOUR_UTC: int | None = None
+    DIGEST_BATCH_SIZE: int = 200
+    # a recipient gets at most one digest in this window
+    DIGEST_MIN_INTERVAL_HOURS: int = 6
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def emails_enabled(self) -> bool:
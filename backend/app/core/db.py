@@ -1,12 +1,209 @@
+import hashlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import event, make_url
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine, SQLModel, select, text
 
 from app import crud
 from app.core.config import settings
-from app.models import User, UserCreate, Email
+from app.core.search import SEARCH_COLUMNS, setup_user_search
+from app.models import (
+    Company, CompanyEmployeeCount, SchemaVersion, TableVersion, User, UserCreate, Email
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# pg_advisory_lock key held while init_db sets the database up
+_INIT_LOCK_KEY = 7_253_716_001
+
+
+def _engine_options(url: str, *, asyncio: bool = False) -> dict[str, Any]:
+    """
+    Pool and connection settings for the engine; anything left unset in the
+    settings gets a default suited to the database behind `url`. With
+    `asyncio`, connection arguments are given in the asyncpg form.
+    """
+    if url.startswith("sqlite"):
+        options: dict[str, Any] = {
+            "connect_args": {
+                "check_same_thread": False,
+                "timeout": settings.SQLITE_BUSY_TIMEOUT_SECONDS,
+            },
+        }
+        if ":memory:" in url:
+            return options
+        # a SQLite connection is just a file handle, so no pings or recycling
+        defaults = {"pool_size": 5, "max_overflow": 10, "pool_recycle": -1, "pool_pre_ping": False}
+    else:
+        # keep connections healthy across database restarts and idle
+        # timeouts in load balancers between the workers and Postgres
+        defaults = {"pool_size": 10, "max_overflow": 20, "pool_recycle": 1800, "pool_pre_ping": True}
+        options = {}
+        if url.startswith("postgres") and settings.DB_STATEMENT_TIMEOUT_MS:
+            if asyncio:
+                options["connect_args"] = {
+                    "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+                }
+            else:
+                options["connect_args"] = {
+                    "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+                }
+    configured = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    for key, value in configured.items():
+        options[key] = defaults[key] if value is None else value
+    options["pool_timeout"] = settings.DB_POOL_TIMEOUT_SECONDS
+    return options
+
+
+def _async_url(url: str) -> str:
+    """
+    The database at `url` through its asyncio driver: aiosqlite for SQLite,
+    asyncpg for Postgres.
+    """
+    parsed = make_url(url)
+    if parsed.drivername.startswith("sqlite"):
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if parsed.drivername.startswith("postgres"):
+        query = dict(parsed.query)
+        # asyncpg calls libpq's sslmode "ssl"
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(drivername="postgresql+asyncpg", query=query)
+        return parsed.render_as_string(hide_password=False)
+    return url
+
+
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    **_engine_options(str(settings.SQLALCHEMY_DATABASE_URI)),
+)
+
+# the same database for async routes, so they can await queries instead of
+# blocking the event loop; it keeps its own pool next to the sync engine's
+async_engine = create_async_engine(
+    _async_url(str(settings.SQLALCHEMY_DATABASE_URI)),
+    **_engine_options(str(settings.SQLALCHEMY_DATABASE_URI), asyncio=True),
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run while another worker is writing
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+
+def pool_status() -> dict[str, int]:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {}
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+def schema_fingerprint() -> str:
+    """
+    Hash of everything init_db sets up: the declared tables, columns,
+    indexes and foreign keys, the search index columns and the first
+    superuser. Changing any model changes it.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for table in SQLModel.metadata.sorted_tables:
+        digest.update(f"table {table.name}".encode())
+        for column in table.columns:
+            foreign_keys = sorted(key.target_fullname for key in column.foreign_keys)
+            digest.update(
+                f"{column.name} {column.type!r} {column.nullable} {column.primary_key} "
+                f"{column.unique} {column.index} {foreign_keys}".encode()
+            )
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(f"index {index.name} {[column.name for column in index.columns]}".encode())
+    digest.update(f"search {SEARCH_COLUMNS} superuser {settings.FIRST_SUPERUSER}".encode())
+    return digest.hexdigest()
+
+
+def _applied_fingerprint(session: Session) -> str | None:
+    try:
+        return session.exec(select(SchemaVersion.fingerprint)).first()
+    except (OperationalError, ProgrammingError):
+        # no schemaversion table yet
+        return None
+    finally:
+        # end the read so a later check sees what other workers committed
+        session.rollback()
+
+
+@contextmanager
+def init_lock() -> Iterator[None]:
+    """
+    Hold an exclusive lock shared by every process using the database while
+    it is set up, so workers and replicas that boot together take turns.
+    Postgres uses an advisory lock; SQLite a lock file next to the database.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _INIT_LOCK_KEY})
+            connection.commit()
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _INIT_LOCK_KEY})
+                connection.commit()
+        return
+    database = engine.url.database
+    if engine.dialect.name != "sqlite" or fcntl is None or not database or database == ":memory:":
+        yield
+        return
+    with open(f"{database}.init.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 
 def init_db(session: Session) -> None:
+    """
+    Create or update the schema and the initial data. When the recorded
+    schema fingerprint matches the code this is a single SELECT.
+    """
+    fingerprint = schema_fingerprint()
+    if _applied_fingerprint(session) == fingerprint:
+        return
+    with init_lock():
+        # another worker may have finished the setup while this one waited
+        if _applied_fingerprint(session) == fingerprint:
+            return
+        _setup_db(session)
+        session.merge(
+            SchemaVersion(id=1, fingerprint=fingerprint, applied_at=datetime.now(timezone.utc))
+        )
+        session.commit()
+
+
+def _setup_db(session: Session) -> None:
     # Tables should be created with Alembic migrations
     # But if you don't want to use migrations, create
     # the tables un-commenting the next lines
@@ -14,8 +211,25 @@ def init_db(session: Session) -> None:
 
     # This works because the models are already imported and registered from app.models
     SQLModel.metadata.create_all(engine)
-    with engine.connect() as connection:
-        connection.execute(text("PRAGMA foreign_keys=ON"))
+    # create_all skips tables that already exist, so add indexes declared
+    # after a table was first created
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        setup_user_search(connection)
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            connection.execute(text("PRAGMA foreign_keys=ON"))
+
+    for table_name in crud.VERSIONED_TABLES:
+        if not session.get(TableVersion, table_name):
+            session.add(TableVersion(table_name=table_name))
+    session.commit()
+
+    # fill the employee count rollup on databases created before it existed
+    if not session.exec(select(CompanyEmployeeCount)).first() and session.exec(select(Company)).first():
+        crud.rebuild_employee_counts(session=session)
 
     user = session.exec(
         select(User).where(User.email == settings.FIRST_SUPERUSER)
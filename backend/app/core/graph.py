@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from heapq import nsmallest
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.models import CompletedRequest
+
+logger = logging.getLogger(__name__)
+
+_EMPTY = array("i")
+
+
+class ConnectionGraph:
+    """
+    Undirected adjacency index over CompletedRequest.
+
+    Every user maps to a sorted array of the ids they are connected with, so
+    mutual connections are an intersection of two arrays and second-degree
+    reach is a count over the neighbours' arrays, with no database round trip.
+
+    The index is loaded lazily and reloaded after CONNECTION_GRAPH_RELOAD_SECONDS
+    so edges accepted by other workers show up. Only the first load makes a
+    request wait; later reloads run in a background task while requests keep
+    reading the old index, and only one load runs at a time. Arrays are never
+    changed in place: add_edge swaps in a new array, so readers can use the
+    ones they already hold without taking the lock.
+    """
+
+    def __init__(self) -> None:
+        self._adjacency: dict[int, array] = {}
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+        self._load_lock = asyncio.Lock()
+        self._reload_task: asyncio.Task | None = None
+        # edges added while a load is running, replayed onto its result since
+        # its SELECT may have run before they were committed
+        self._added_during_load: list[tuple[int, int]] | None = None
+
+    def _stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > settings.CONNECTION_GRAPH_RELOAD_SECONDS
+        )
+
+    @staticmethod
+    def _build(rows: list[tuple[int, int]]) -> dict[int, array]:
+        neighbours: dict[int, set[int]] = {}
+        for requester_id, requested_id in rows:
+            if requester_id == requested_id:
+                continue
+            neighbours.setdefault(requester_id, set()).add(requested_id)
+            neighbours.setdefault(requested_id, set()).add(requester_id)
+        return {user_id: array("i", sorted(ids)) for user_id, ids in neighbours.items()}
+
+    async def load(self, session: AsyncSession) -> None:
+        async with self._load_lock:
+            await self._load(session)
+
+    async def _load(self, session: AsyncSession) -> None:
+        with self._lock:
+            self._added_during_load = []
+        try:
+            rows = await session.exec(select(CompletedRequest.requester_id, CompletedRequest.requested_id))
+            # building the arrays takes a while on a big network, so it runs
+            # in a thread instead of holding up the event loop
+            adjacency = await run_in_threadpool(self._build, rows.all())
+            with self._lock:
+                for user_id, other_id in self._added_during_load:
+                    self._insert(adjacency, user_id, other_id)
+                    self._insert(adjacency, other_id, user_id)
+                self._adjacency = adjacency
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._added_during_load = None
+
+    async def _reload(self) -> None:
+        try:
+            async with AsyncSession(async_engine) as session:
+                async with self._load_lock:
+                    if self._stale():
+                        await self._load(session)
+        except Exception:
+            # the old index keeps being served and the next request retries
+            logger.exception("Reloading the connection graph failed")
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        if not self._stale():
+            return
+        if self._loaded_at is None:
+            # nothing to serve yet, so wait for the first load; concurrent
+            # callers queue on the lock and find it done
+            async with self._load_lock:
+                if self._stale():
+                    await self._load(session)
+            return
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self._reload())
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    @staticmethod
+    def _insert(adjacency: dict[int, array], user_id: int, other_id: int) -> None:
+        current = adjacency.get(user_id, _EMPTY)
+        position = bisect_left(current, other_id)
+        if position < len(current) and current[position] == other_id:
+            return
+        updated = array("i", current)
+        updated.insert(position, other_id)
+        adjacency[user_id] = updated
+
+    def add_edge(self, user_id: int, other_id: int) -> None:
+        """
+        Record a newly accepted connection. A running load replays it onto
+        the index it builds; before the first load it is left to the database.
+        """
+        if user_id == other_id:
+            return
+        with self._lock:
+            if self._added_during_load is not None:
+                self._added_during_load.append((user_id, other_id))
+            if self._loaded_at is None:
+                return
+            self._insert(self._adjacency, user_id, other_id)
+            self._insert(self._adjacency, other_id, user_id)
+
+    def neighbours(self, user_id: int) -> array:
+        return self._adjacency.get(user_id, _EMPTY)
+
+    def mutual(self, user_id: int, other_id: int) -> list[int]:
+        """
+        Ids connected to both users, ascending.
+        """
+        first, second = self.neighbours(user_id), self.neighbours(other_id)
+        if len(first) > len(second):
+            first, second = second, first
+        return sorted(set(first).intersection(second))
+
+    def second_degree(self, user_id: int, top: int) -> tuple[int, list[tuple[int, int]]]:
+        """
+        How many people are exactly two hops away, and (id, mutual connection
+        count) for the `top` of them with the most shared connections.
+        """
+        direct = self.neighbours(user_id)
+        counts: Counter[int] = Counter()
+        for neighbour_id in direct:
+            counts.update(self.neighbours(neighbour_id))
+        counts.pop(user_id, None)
+        for neighbour_id in direct:
+            counts.pop(neighbour_id, None)
+        ranked = nsmallest(top, counts.items(), key=lambda item: (-item[1], item[0]))
+        return len(counts), ranked
+
+
+connection_graph = ConnectionGraph()
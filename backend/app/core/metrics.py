@@ -0,0 +1,192 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import Engine, event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.db import pool_status
+from app.core.security import password_hash_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# requests that match no route share one label, so random paths can't
+# create new series
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class _RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_lock = threading.Lock()
+_latency: dict[tuple[str, str], _Histogram] = {}
+_responses: dict[tuple[str, str, int], int] = {}
+_db_queries: dict[tuple[str, str], int] = {}
+_db_seconds: dict[tuple[str, str], _Histogram] = {}
+_in_flight: dict[str, int] = {}
+
+# the stats of the request being handled; sync routes run in a threadpool,
+# which copies the context, so the hooks still find it there
+_current_request: ContextVar[_RequestStats | None] = ContextVar("metrics_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["metrics_query_start"].pop()
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def _handle_error(exception_context) -> None:
+    # after_cursor_execute doesn't run for a failed statement
+    starts = exception_context.connection.info.get("metrics_query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and database use per route template.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        stats = _RequestStats()
+        token = _current_request.set(stats)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with _lock:
+            _in_flight[method] = _in_flight.get(method, 0) + 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(token)
+            # the router leaves the matched route in the scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            key = (method, route)
+            with _lock:
+                _in_flight[method] -= 1
+                _latency.setdefault(key, _Histogram()).observe(elapsed)
+                _responses[(method, route, status)] = _responses.get((method, route, status), 0) + 1
+                _db_queries[key] = _db_queries.get(key, 0) + stats.queries
+                _db_seconds.setdefault(key, _Histogram()).observe(stats.db_seconds)
+
+
+def _labels(**labels: Any) -> str:
+    def escape(value: Any) -> str:
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, histograms: dict[tuple[str, str], _Histogram]) -> list[str]:
+    lines = []
+    for (method, route), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), histogram.buckets):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.count}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """
+    This worker's metrics in the Prometheus text exposition format.
+    """
+    with _lock:
+        lines = [
+            "# HELP http_request_duration_seconds Time spent handling requests.",
+            "# TYPE http_request_duration_seconds histogram",
+            *_histogram_lines("http_request_duration_seconds", _latency),
+            "# HELP http_responses_total Responses sent, by status code.",
+            "# TYPE http_responses_total counter",
+            *(
+                f"http_responses_total{_labels(method=method, route=route, status=status)} {count}"
+                for (method, route, status), count in sorted(_responses.items())
+            ),
+            "# HELP http_requests_in_flight Requests being handled right now.",
+            "# TYPE http_requests_in_flight gauge",
+            *(
+                f"http_requests_in_flight{_labels(method=method)} {count}"
+                for method, count in sorted(_in_flight.items())
+            ),
+            "# HELP http_request_db_queries_total Database statements run while handling requests.",
+            "# TYPE http_request_db_queries_total counter",
+            *(
+                f"http_request_db_queries_total{_labels(method=method, route=route)} {count}"
+                for (method, route), count in sorted(_db_queries.items())
+            ),
+            "# HELP http_request_db_seconds Time per request spent waiting on the database.",
+            "# TYPE http_request_db_seconds histogram",
+            *_histogram_lines("http_request_db_seconds", _db_seconds),
+        ]
+
+    pool = pool_status()
+    if pool:
+        lines += ["# HELP db_pool_connections Connections in this worker's pool, by state.",
+                  "# TYPE db_pool_connections gauge"]
+        lines += [f"db_pool_connections{_labels(state=state)} {count}" for state, count in pool.items()]
+
+    hash_stats = password_hash_stats()
+    lines += [
+        "# HELP password_hash_jobs Password hashing jobs waiting for or running in the pool.",
+        "# TYPE password_hash_jobs gauge",
+        f"password_hash_jobs{_labels(state='waiting')} {hash_stats['waiting']}",
+        f"password_hash_jobs{_labels(state='in_flight')} {hash_stats['in_flight']}",
+        "# HELP password_hash_jobs_completed_total Password hashing jobs finished.",
+        "# TYPE password_hash_jobs_completed_total counter",
+        f"password_hash_jobs_completed_total {hash_stats['completed']}",
+        "# HELP password_hash_jobs_failed_total Password hashing jobs that raised.",
+        "# TYPE password_hash_jobs_failed_total counter",
+        f"password_hash_jobs_failed_total {hash_stats['failed']}",
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,122 @@
+import functools
+import inspect
+import logging
+from collections import Counter
+from collections.abc import Callable
+from contextvars import ContextVar, Token
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class _Tracker:
+    __slots__ = ("statements",)
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+
+_current: ContextVar[_Tracker | None] = ContextVar("query_budget", default=None)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.statements.append(statement)
+
+
+def instrument_engine(engine: Engine) -> None:
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class query_budget:
+    """
+    Count the SQL statements run inside a block or a route handler.
+
+    Statement shapes (the SQL with its placeholders) that repeat at least
+    QUERY_BUDGET_REPEAT_THRESHOLD times are logged as a probable N+1. Going
+    over `max_queries` is logged too, or raises QueryBudgetExceeded when
+    strict, which defaults to QUERY_BUDGET_STRICT so tests and staging can
+    fail loudly while production only logs.
+
+        @router.post("/accept/{request_id}")
+        @query_budget(8)
+        async def accept_request(...): ...
+
+        with query_budget(2, strict=True) as budget:
+            ...
+        budget.count
+
+    Only statements run in the same context are counted; for a route that
+    is the handler body, not its dependencies.
+    """
+
+    def __init__(self, max_queries: int | None = None, *, name: str | None = None, strict: bool | None = None) -> None:
+        self.max_queries = max_queries
+        self.name = name
+        self.strict = settings.QUERY_BUDGET_STRICT if strict is None else strict
+        self.statements: list[str] = []
+        self._tracker: _Tracker | None = None
+        self._token: Token | None = None
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self) -> "query_budget":
+        self._tracker = _Tracker()
+        self._token = _current.set(self._tracker)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current.reset(self._token)
+        self.statements = self._tracker.statements
+        # an enclosing budget also pays for what ran in this one
+        outer = _current.get()
+        if outer is not None:
+            outer.statements.extend(self.statements)
+        if exc_type is None:
+            self._check()
+
+    def _check(self) -> None:
+        name = self.name or "query budget"
+        for statement, repeats in Counter(self.statements).items():
+            if repeats >= settings.QUERY_BUDGET_REPEAT_THRESHOLD:
+                logger.warning(
+                    f"{name}: probable N+1, same statement ran {repeats} times: "
+                    f"{' '.join(statement.split())[:200]}"
+                )
+        if self.max_queries is not None and self.count > self.max_queries:
+            message = f"{name}: {self.count} queries, budget is {self.max_queries}"
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def __call__(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        name = self.name or func.__qualname__
+
+        def budget() -> "query_budget":
+            return query_budget(self.max_queries, name=name, strict=self.strict)
+
+        # functools.wraps keeps the signature FastAPI reads the parameters from
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with budget():
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with budget():
+                return func(*args, **kwargs)
+        return wrapper
@@ -0,0 +1,202 @@
+import re
+from typing import Any
+
+from sqlalchemy import Connection, Float, Integer, String, cast, column, literal, literal_column, table
+from sqlmodel import Session, func, select, union_all
+
+from app.models import FacetCount, User
+
+# columns covered by the directory text search
+SEARCH_COLUMNS = ("full_name", "bio", "current_role", "current_company", "location")
+FACET_COLUMNS = (
+    "graduation_year",
+    "is_alumni",
+    "open_to_mentorship",
+    "open_to_coffee_chats",
+    "available_for_referrals",
+)
+
+# SQLite: external-content FTS5 table over "user", kept in sync by triggers
+_fts = table("user_fts", column("rowid"))
+_FTS_COLUMNS = ", ".join(SEARCH_COLUMNS)
+_FTS_NEW = ", ".join(f"new.{name}" for name in SEARCH_COLUMNS)
+_FTS_OLD = ", ".join(f"old.{name}" for name in SEARCH_COLUMNS)
+_SQLITE_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS user_fts_ai AFTER INSERT ON "user" BEGIN
+        INSERT INTO user_fts(rowid, {_FTS_COLUMNS}) VALUES (new.id, {_FTS_NEW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_fts_ad AFTER DELETE ON "user" BEGIN
+        INSERT INTO user_fts(user_fts, rowid, {_FTS_COLUMNS}) VALUES ('delete', old.id, {_FTS_OLD});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF {_FTS_COLUMNS} ON "user" BEGIN
+        INSERT INTO user_fts(user_fts, rowid, {_FTS_COLUMNS}) VALUES ('delete', old.id, {_FTS_OLD});
+        INSERT INTO user_fts(rowid, {_FTS_COLUMNS}) VALUES (new.id, {_FTS_NEW});
+    END""",
+)
+
+# Postgres: GIN index over the same tsvector expression the query uses
+_TS_CONFIG = literal_column("'english'")
+
+
+def _pg_document() -> Any:
+    text_value = func.coalesce(getattr(User, SEARCH_COLUMNS[0]), "")
+    for name in SEARCH_COLUMNS[1:]:
+        text_value = text_value + " " + func.coalesce(getattr(User, name), "")
+    return func.to_tsvector(_TS_CONFIG, text_value)
+
+
+def setup_user_search(connection: Connection) -> None:
+    """
+    Create the text index used by search_users if it does not exist yet.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_fts'"
+        ).first()
+        if not exists:
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE user_fts USING fts5({_FTS_COLUMNS}, "
+                "content='user', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+            # index the users that were there before the table existed
+            connection.exec_driver_sql("INSERT INTO user_fts(user_fts) VALUES ('rebuild')")
+        for trigger in _SQLITE_TRIGGERS:
+            connection.exec_driver_sql(trigger)
+    elif dialect == "postgresql":
+        document = _pg_document().compile(
+            dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+        )
+        connection.exec_driver_sql(
+            f'CREATE INDEX IF NOT EXISTS ix_user_search_document ON "user" USING GIN ({document})'
+        )
+
+
+def suspend_user_search(connection: Connection) -> None:
+    """
+    Stop keeping the text index in step with "user" row by row, ahead of a
+    bulk load. rebuild_user_search() indexes everything in one pass after.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        for name in ("user_fts_ai", "user_fts_ad", "user_fts_au"):
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    elif dialect == "postgresql":
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_user_search_document")
+
+
+def rebuild_user_search(connection: Connection) -> None:
+    """
+    Re-index every user and restore what suspend_user_search() removed.
+    """
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("INSERT INTO user_fts(user_fts) VALUES ('rebuild')")
+    setup_user_search(connection)
+
+
+def _sqlite_match_query(q: str) -> str:
+    # quote every word so user input can't be parsed as FTS5 syntax, and
+    # prefix-match it so "soft" finds "software"
+    words = re.findall(r"\w+", q)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_users(
+    *,
+    session: Session,
+    q: str | None,
+    exclude_user_id: int | None,
+    filters: dict[str, Any],
+    skip: int,
+    limit: int,
+) -> tuple[list[User], int, dict[str, list[FacetCount]]]:
+    """
+    Rank visible users against `q` and count facet values over all matches.
+
+    Ranking, the total and every facet count come back from one statement
+    built on a shared CTE; only the page of hits is then loaded by primary key.
+    """
+    dialect = session.get_bind().dialect.name
+    score: Any = literal(0.0)
+    statement = select(User.id)
+    if q and q.strip():
+        if dialect == "sqlite":
+            match = _sqlite_match_query(q)
+            if match:
+                # bm25() is lower for better matches
+                score = -func.bm25(literal_column("user_fts"))
+                statement = statement.join(_fts, _fts.c.rowid == User.id).where(
+                    literal_column("user_fts").op("MATCH")(match)
+                )
+        elif dialect == "postgresql":
+            document = _pg_document()
+            query = func.websearch_to_tsquery(_TS_CONFIG, q)
+            score = func.ts_rank(document, query)
+            statement = statement.where(document.op("@@")(query))
+        else:
+            pattern = f"%{q.strip()}%"
+            statement = statement.where(
+                func.concat(*[func.coalesce(getattr(User, name), "") for name in SEARCH_COLUMNS]).ilike(pattern)
+            )
+
+    statement = statement.where(User.profile_visible == True)
+    if exclude_user_id is not None:
+        statement = statement.where(User.id != exclude_user_id)
+    for name, value in filters.items():
+        if value is not None:
+            statement = statement.where(getattr(User, name) == value)
+
+    matched = statement.add_columns(
+        score.label("score"), *[getattr(User, name) for name in FACET_COLUMNS]
+    ).cte("matched")
+
+    def row(kind: str, value: Any, count: Any, user_id: Any, rank: Any) -> Any:
+        return select(
+            literal(kind).label("kind"),
+            cast(value, String).label("value"),
+            cast(count, Integer).label("count"),
+            cast(user_id, Integer).label("user_id"),
+            cast(rank, Float).label("score"),
+        )
+
+    hits = (
+        select(matched.c.id, matched.c.score)
+        .order_by(matched.c.score.desc(), matched.c.id)
+        .offset(skip)
+        .limit(limit)
+        .subquery("hits")
+    )
+    parts = [
+        row("total", None, func.count(), None, None).select_from(matched),
+        row("hit", None, None, hits.c.id, hits.c.score).select_from(hits),
+    ]
+    for name in FACET_COLUMNS:
+        parts.append(
+            row(name, matched.c[name], func.count(), None, None)
+            .select_from(matched)
+            .group_by(matched.c[name])
+        )
+
+    count = 0
+    hits_found: list[tuple[float, int]] = []
+    facets: dict[str, list[FacetCount]] = {name: [] for name in FACET_COLUMNS}
+    for kind, value, value_count, user_id, rank in session.exec(union_all(*parts)).all():
+        if kind == "total":
+            count = value_count
+        elif kind == "hit":
+            hits_found.append((rank, user_id))
+        else:
+            if value is not None and kind != "graduation_year":
+                value = "true" if value in ("1", "true") else "false"
+            facets[kind].append(FacetCount(value=value, count=value_count))
+    for values in facets.values():
+        values.sort(key=lambda facet: facet.count, reverse=True)
+    # a UNION ALL keeps no order from its parts, so the hits are put back in
+    # the order the hits subquery picked them by
+    hit_ids = [user_id for _, user_id in sorted(hits_found, key=lambda hit: (-hit[0], hit[1]))]
+
+    users_by_id = {
+        user.id: user for user in session.exec(select(User).where(User.id.in_(hit_ids))).all()
+    }
+    users = [users_by_id[user_id] for user_id in hit_ids if user_id in users_by_id]
+    return users, count, facets
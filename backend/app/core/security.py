@@ -1,8 +1,13 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Callable, TypeVar
 
 import jwt
 from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
 
@@ -11,6 +16,8 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
@@ -19,9 +26,110 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     return encoded_jwt
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# bcrypt is deliberately slow, so hashing runs in a pool of worker processes
+# instead of on the request thread. _hash_slots caps how many jobs may be
+# submitted at once; callers over the cap wait, and that wait is the queue
+# depth reported by password_hash_stats(). Async callers have their own
+# cap, _async_hash_slots, so they wait on the event loop instead of polling
+# or tying up a thread; sync callers are also bounded by the threadpool.
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_MAX_CONCURRENCY)
+_async_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_CONCURRENCY)
+_stats_lock = threading.Lock()
+_hash_stats = {"waiting": 0, "in_flight": 0, "completed": 0, "failed": 0}
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            # spawn, not fork: the app has threads running by the time the
+            # first password is checked
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_pool
+
+
+def _count(key: str, delta: int) -> None:
+    with _stats_lock:
+        _hash_stats[key] += delta
+
+
+def _run_hash_job(fn: Callable[..., T], *args: Any) -> T:
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    _count("waiting", 1)
+    _hash_slots.acquire()
+    _count("waiting", -1)
+    _count("in_flight", 1)
+    try:
+        result = _get_hash_pool().submit(fn, *args).result()
+    except Exception:
+        _count("failed", 1)
+        raise
+    finally:
+        _count("in_flight", -1)
+        _hash_slots.release()
+    _count("completed", 1)
+    return result
+
+
+async def _arun_hash_job(fn: Callable[..., T], *args: Any) -> T:
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return await run_in_threadpool(fn, *args)
+    _count("waiting", 1)
+    try:
+        await _async_hash_slots.acquire()
+    finally:
+        _count("waiting", -1)
+    _count("in_flight", 1)
+    try:
+        result = await asyncio.wrap_future(_get_hash_pool().submit(fn, *args))
+    except Exception:
+        _count("failed", 1)
+        raise
+    finally:
+        _count("in_flight", -1)
+        _async_hash_slots.release()
+    _count("completed", 1)
+    return result
+
+
+def password_hash_stats() -> dict[str, int]:
+    with _stats_lock:
+        return dict(_hash_stats)
+
+
+def shutdown_password_hash_pool() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _run_hash_job(_verify, plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return _run_hash_job(_hash, password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _arun_hash_job(_verify, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    return await _arun_hash_job(_hash, password)
\ No newline at end of file
@@ -1,9 +1,18 @@
+from datetime import datetime, timezone
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, delete, func, insert, select, update
 
-from app.core.security import get_password_hash, verify_password
-from app.models import User, UserCreate, UserUpdate, Email
+from starlette.concurrency import run_in_threadpool
+
+from app.core.security import averify_password, get_password_hash, verify_password
+from app.models import (
+    Company, CompanyEmployeeCount, TableVersion, User, UserCreate, UserUpdate, Email
+)
+
+# tables whose change counter backs the ETags of the company routes
+VERSIONED_TABLES = ("company", "companyemployeecount")
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
@@ -23,7 +32,10 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
         password = user_data["password"]
         hashed_password = get_password_hash(password)
         extra_data["hashed_password"] = hashed_password
+    old_company = db_user.current_company
+    extra_data["updated_at"] = datetime.now(timezone.utc)
     db_user.sqlmodel_update(user_data, update=extra_data)
+    change_current_company(session=session, old=old_company, new=db_user.current_company)
     session.add(db_user)
     session.commit()
     session.refresh(db_user)
@@ -44,6 +56,128 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
         return None
     return db_user
 
+
+async def aauthenticate(*, session: Session, email: str, password: str) -> User | None:
+    """
+    authenticate() for async routes, the bcrypt check is awaited instead of
+    holding a threadpool thread while it runs
+    """
+    db_user = await run_in_threadpool(get_user_by_email, session=session, email=email)
+    if not db_user:
+        return None
+    if not await averify_password(password, db_user.hashed_password):
+        return None
+    return db_user
+
+def add_company_employee_count(*, session: Session, company_name: str) -> None:
+    """
+    Start the employee count for a newly created company. Users may already
+    list it as their current company, so count them.
+    """
+    employee_count = session.exec(
+        select(func.count()).select_from(User).where(User.current_company == company_name)
+    ).one()
+    session.add(CompanyEmployeeCount(company_name=company_name, employee_count=employee_count))
+    bump_table_version(session=session, table_name="companyemployeecount")
+
+
+def upsert_companies(*, session: Session, names: list[str]) -> list[str]:
+    """
+    Create whichever of `names` don't exist yet with one INSERT ... ON CONFLICT
+    DO NOTHING, returning the names that were actually created.
+    """
+    names = sorted(set(names))
+    if not names:
+        return []
+    if session.get_bind().dialect.name == "postgresql":
+        statement = postgresql.insert(Company)
+    else:
+        statement = sqlite.insert(Company)
+    created = list(
+        session.exec(
+            statement.values([{"name": name} for name in names])
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(Company.name)
+        ).scalars().all()
+    )
+    if created:
+        bump_table_version(session=session, table_name="company")
+    _add_company_employee_counts(session=session, names=created)
+    return created
+
+
+def _add_company_employee_counts(*, session: Session, names: list[str]) -> None:
+    if not names:
+        return
+    session.exec(
+        insert(CompanyEmployeeCount).from_select(
+            ["company_name", "employee_count"],
+            select(Company.name, func.count(User.id))
+            .select_from(Company)
+            .outerjoin(User, Company.name == User.current_company)
+            .where(Company.name.in_(names))
+            .group_by(Company.name),
+        )
+    )
+    bump_table_version(session=session, table_name="companyemployeecount")
+
+
+def change_current_company(*, session: Session, old: str | None, new: str | None) -> None:
+    """
+    Move one employee between companies in the employee count rollup. Call it
+    in the same transaction that changes a user's current_company.
+    """
+    if old == new:
+        return
+    if old:
+        session.exec(
+            update(CompanyEmployeeCount)
+            .where(CompanyEmployeeCount.company_name == old)
+            .values(employee_count=CompanyEmployeeCount.employee_count - 1)
+        )
+    if new:
+        session.exec(
+            update(CompanyEmployeeCount)
+            .where(CompanyEmployeeCount.company_name == new)
+            .values(employee_count=CompanyEmployeeCount.employee_count + 1)
+        )
+    bump_table_version(session=session, table_name="companyemployeecount")
+
+
+def rebuild_employee_counts(*, session: Session) -> None:
+    """
+    Recompute the employee count rollup from scratch.
+    """
+    session.exec(delete(CompanyEmployeeCount))
+    session.exec(
+        insert(CompanyEmployeeCount).from_select(
+            ["company_name", "employee_count"],
+            select(Company.name, func.count(User.id))
+            .select_from(Company)
+            .outerjoin(User, Company.name == User.current_company)
+            .group_by(Company.name),
+        )
+    )
+    bump_table_version(session=session, table_name="companyemployeecount")
+    session.commit()
+
+
+def bump_table_version(*, session: Session, table_name: str) -> None:
+    """
+    Advance the change counter of `table_name`. Call it in the transaction
+    that changes the table, so the new version commits with the data.
+    """
+    session.exec(
+        update(TableVersion)
+        .where(TableVersion.table_name == table_name)
+        .values(version=TableVersion.version + 1)
+    )
+
+
+def get_table_version(*, session: Session, table_name: str) -> int:
+    table_version = session.get(TableVersion, table_name)
+    return table_version.version if table_version else 0
+
 # def change_old_preffered_email(*, session: Session)
 
 
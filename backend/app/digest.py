@@ -0,0 +1,170 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, or_, select, update
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Email, NotificationPreference, Request, User
+from app.outbox import enqueue_email, notify_outbox
+from app.utils import generate_connection_digest_email
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_stopping = threading.Event()
+_scheduler: threading.Thread | None = None
+
+
+def _claim_recipients(
+    session: Session, user_ids: list[int], now: datetime, cutoff: datetime
+) -> set[int]:
+    # Another worker may be running the same digest; whoever moves
+    # last_digest_at forward first owns the recipient. Users without a
+    # preferred address are left unclaimed, so their requests wait for the
+    # first digest after they add one instead of being skipped.
+    claimed = session.exec(
+        update(NotificationPreference)
+        .where(
+            NotificationPreference.user_id.in_(user_ids),
+            NotificationPreference.user_id.in_(
+                select(Email.user_id).where(Email.preferred == True)
+            ),
+            or_(
+                NotificationPreference.last_digest_at == None,
+                NotificationPreference.last_digest_at <= cutoff,
+            ),
+        )
+        .values(last_digest_at=now)
+        .returning(NotificationPreference.user_id)
+    ).scalars().all()
+    return set(claimed)
+
+
+def _send_batch(session: Session, preferences: list[NotificationPreference], now: datetime) -> int:
+    cutoff = now - timedelta(hours=settings.DIGEST_MIN_INTERVAL_HOURS)
+    since = {
+        preference.user_id: preference.last_digest_at or datetime.min
+        for preference in preferences
+    }
+    claimed = list(_claim_recipients(session, list(since), now, cutoff))
+    if not claimed:
+        session.commit()
+        return 0
+
+    # every claimed recipient's new requests, with the requester, in one
+    # query. Requests after `now` are left for the next digest, which starts
+    # from the last_digest_at = now set by the claim.
+    pending: dict[int, list[dict]] = {}
+    rows = session.exec(
+        select(Request, User)
+        .join(User, User.id == Request.requester_id)
+        .where(
+            Request.requested_id.in_(claimed),
+            Request.created_at > min(since[i] for i in claimed),
+            Request.created_at <= now,
+        )
+        .order_by(Request.requested_id, Request.created_at)
+    ).all()
+    for request, requester in rows:
+        if request.created_at <= since[request.requested_id]:
+            continue
+        pending.setdefault(request.requested_id, []).append({
+            "request_id": request.id,
+            "requester_name": requester.full_name or requester.email,
+            "requester_title": requester.current_role,
+            "requester_company": requester.current_company,
+            "requester_graduation_year": requester.graduation_year,
+            "message": request.message,
+        })
+
+    recipients = session.exec(
+        select(User, Email.email)
+        .join(Email, Email.user_id == User.id)
+        .where(User.id.in_(list(pending)), Email.preferred == True)
+    ).all()
+    sent = 0
+    for recipient, email_to in recipients:
+        email_data = generate_connection_digest_email(
+            email_to=email_to,
+            requested_name=recipient.full_name or recipient.email,
+            requests=pending[recipient.id],
+        )
+        enqueue_email(session=session, email_to=email_to, email_data=email_data)
+        sent += 1
+    # the claims and the queued emails commit together
+    session.commit()
+    return sent
+
+
+def send_connection_digests() -> int:
+    """
+    Queue one digest email per daily-digest user with requests received since
+    their last digest. Recipients are read in batches of DIGEST_BATCH_SIZE.
+    """
+    if not settings.emails_enabled:
+        return 0
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    sent = 0
+    last_user_id = 0
+    with Session(engine, expire_on_commit=False) as session:
+        while True:
+            preferences = session.exec(
+                select(NotificationPreference)
+                .where(
+                    NotificationPreference.connection_requests == "daily",
+                    NotificationPreference.user_id > last_user_id,
+                )
+                .order_by(NotificationPreference.user_id)
+                .limit(settings.DIGEST_BATCH_SIZE)
+            ).all()
+            if not preferences:
+                break
+            last_user_id = preferences[-1].user_id
+            sent += _send_batch(session, list(preferences), now)
+    if sent:
+        notify_outbox()
+    return sent
+
+
+def _seconds_until_next_run(now: datetime) -> float:
+    next_run = now.replace(hour=settings.DIGEST_HOUR_UTC, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+def _scheduler_loop() -> None:
+    while not _stopping.wait(_seconds_until_next_run(datetime.now(timezone.utc))):
+        try:
+            logger.info(f"Queued {send_connection_digests()} connection digests")
+        except Exception:
+            logger.exception("connection digest run failed")
+
+
+def start_digest_scheduler() -> None:
+    global _scheduler
+    if _scheduler or settings.DIGEST_HOUR_UTC is None or not settings.emails_enabled:
+        return
+    _stopping.clear()
+    _scheduler = threading.Thread(target=_scheduler_loop, name="connection-digest", daemon=True)
+    _scheduler.start()
+
+
+def stop_digest_scheduler(timeout: float = 10.0) -> None:
+    global _scheduler
+    _stopping.set()
+    if _scheduler:
+        _scheduler.join(timeout)
+        _scheduler = None
+
+
+def main() -> None:
+    logger.info("Sending connection request digests")
+    sent = send_connection_digests()
+    logger.info(f"Queued {sent} connection digests")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,41 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db import async_engine, engine
+from app.core import query_budget
+from app.core.metrics import MetricsMiddleware, instrument_engine
+from app.core.security import shutdown_password_hash_pool
+from app.digest import start_digest_scheduler, stop_digest_scheduler
+from app.outbox import start_outbox_workers, stop_outbox_workers
+from app.utils import preload_email_templates
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    preload_email_templates()
+    start_outbox_workers()
+    start_digest_scheduler()
+    yield
+    stop_digest_scheduler()
+    stop_outbox_workers()
+    shutdown_password_hash_pool()
+    await async_engine.dispose()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -26,4 +48,9 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+for instrumented in (engine, async_engine.sync_engine):
+    instrument_engine(instrumented)
+    query_budget.instrument_engine(instrumented)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
\ No newline at end of file
@@ -3,9 +3,10 @@
 import uuid
 
 from pydantic import EmailStr
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Any, List, Literal, Optional
 
 # Shared properties
 class UserBase(SQLModel):
@@ -63,6 +64,9 @@ class UpdatePassword(SQLModel):
 
 # Database model
 class User(UserBase, table=True):
+    # the directory lists visible users in id order
+    __table_args__ = (Index("ix_user_profile_visible_id", "profile_visible", "id"),)
+
     id: int | None = Field(default=None, primary_key=True) # auto increments because sqlalchemy is dumb
     hashed_password: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -71,7 +75,7 @@ class User(UserBase, table=True):
     graduation_year: Optional[int] = None
     linkedin_url: Optional[str] = None
     personal_website: Optional[str] = None
-    current_company: Optional[str] = None
+    current_company: Optional[str] = Field(default=None, index=True)
     current_role: Optional[str] = None
     profile_image: Optional[str] = None
     open_to_coffee_chats: bool = False
@@ -102,12 +106,51 @@ class UserPublic(UserBase):
 class UsersPublic(SQLModel):
     data: list[UserPublic]
     count: int
+    next_cursor: Optional[str] = None
+
+# A UserPublic cut down to the columns asked for with fields=; only id is
+# always present, the rest appear when requested.
+class UserProjection(SQLModel):
+    id: int
+    email: Optional[EmailStr] = None
+    is_active: Optional[bool] = None
+    is_superuser: Optional[bool] = None
+    full_name: Optional[str] = None
+    location: Optional[str] = None
+    graduation_year: Optional[int] = None
+    linkedin_url: Optional[str] = None
+    personal_website: Optional[str] = None
+    current_company: Optional[str] = None
+    current_role: Optional[str] = None
+    profile_image: Optional[str] = None
+    open_to_coffee_chats: Optional[bool] = None
+    open_to_mentorship: Optional[bool] = None
+    available_for_referrals: Optional[bool] = None
+    bio: Optional[str] = None
+    is_alumni: Optional[bool] = None
+    profile_visible: Optional[bool] = None
+
+class UsersProjected(SQLModel):
+    data: list[UserProjection]
+    count: int
+    next_cursor: Optional[str] = None
+
+class FacetCount(SQLModel):
+    value: Optional[str]
+    count: int
+
+class UserSearchResults(SQLModel):
+    data: list[UserPublic]
+    count: int
+    facets: dict[str, list[FacetCount]]
 
 class EmailBase(SQLModel):
     email: EmailStr = Field(primary_key=True)
     preferred: bool = False
 
 class Email(EmailBase, table=True):
+    __table_args__ = (Index("ix_email_user_id_preferred", "user_id", "preferred"),)
+
     user_id: int = Field(foreign_key="user.id", nullable=False)
 
 class EmailsPublic(SQLModel):
@@ -127,6 +170,12 @@ class CompaniesPublic(SQLModel):
     data: list[Company]
     count: int
 
+# number of users whose current_company is the company, kept up to date by
+# crud.change_current_company so /companies/employee_counts needs no GROUP BY
+class CompanyEmployeeCount(SQLModel, table=True):
+    company_name: str = Field(foreign_key="company.name", primary_key=True)
+    employee_count: int = Field(default=0, index=True)
+
 # INTERNSHIPS
 class Internship(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
@@ -141,6 +190,14 @@ class InternshipsPublic(SQLModel):
 
 # INTERVIEWS
 class Interview(SQLModel, table=True):
+    # the interview board filters by company or role and lists newest seasons
+    # first, paging on (season, id)
+    __table_args__ = (
+        Index("ix_interview_company_season", "company_name", "season", "id"),
+        Index("ix_interview_role_season", "role", "season", "id"),
+        Index("ix_interview_season", "season", "id"),
+    )
+
     id: int | None = Field(default=None, primary_key=True) # order is implicit as id is sorted
     user_id: int = Field(foreign_key="user.id", nullable=False)
     company_name: str = Field(foreign_key="company.name", nullable=False)
@@ -153,12 +210,22 @@ class Interview(SQLModel, table=True):
 class InterviewsPublic(SQLModel):
     data: list[Interview]
     count: int
+    next_cursor: Optional[str] = None
+
+class InterviewImportError(SQLModel):
+    index: int
+    errors: list[dict[str, Any]]
+
+class InterviewImportResult(SQLModel):
+    data: list[Interview]
+    inserted: int
+    errors: list[InterviewImportError]
 
 # FULL TIME
 class Employment(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id", nullable=False)
-    company_name: str = Field(foreign_key="company.name")
+    user_id: int = Field(foreign_key="user.id", nullable=False, index=True)
+    company_name: str = Field(foreign_key="company.name", index=True)
     type: str = Field(regex="^(internship|full time)$")
     start: datetime
     end: Optional[datetime] = None
@@ -183,6 +250,12 @@ class EmploymentsList(SQLModel):
 
 # CONNECTION REQUESTS
 class Request(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_request_requester_requested", "requester_id", "requested_id"),
+        # the daily digest reads each recipient's requests since their last one
+        Index("ix_request_requested_created", "requested_id", "created_at"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     requester_id: int = Field(foreign_key="user.id", nullable=False)
@@ -197,8 +270,70 @@ class RequestPublic(SQLModel):
 class CompletedRequest(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    requester_id: int = Field(foreign_key="user.id", nullable=False)
-    requested_id: int = Field(foreign_key="user.id", nullable=False)
+    requester_id: int = Field(foreign_key="user.id", nullable=False, index=True)
+    requested_id: int = Field(foreign_key="user.id", nullable=False, index=True)
+
+class ConnectionPublic(SQLModel):
+    id: int
+    created_at: datetime
+    direction: str # "sent" if the current user made the request, else "received"
+    user: UserPublic
+
+class ConnectionsPublic(SQLModel):
+    data: list[ConnectionPublic]
+    count: int
+    sent: int
+    received: int
+    next_cursor: Optional[str] = None
+
+class SecondDegreeConnection(SQLModel):
+    user: UserPublic
+    mutual_count: int
+
+class SecondDegreeConnectionsPublic(SQLModel):
+    data: list[SecondDegreeConnection]
+    count: int
+
+# NOTIFICATIONS
+# how connection request emails reach a user: one email per request, or one
+# daily digest of the requests received since the last one
+ConnectionRequestDelivery = Literal["immediate", "daily"]
+
+class NotificationPreference(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    connection_requests: str = Field(default="immediate", max_length=16, index=True)
+    last_digest_at: Optional[datetime] = None
+
+class NotificationPreferencePublic(SQLModel):
+    connection_requests: ConnectionRequestDelivery = "immediate"
+
+# change counter per table, bumped by crud whenever the table is written
+class TableVersion(SQLModel, table=True):
+    table_name: str = Field(primary_key=True, max_length=64)
+    version: int = 0
+
+# fingerprint of what init_db last set up (see app.core.db), one row; when it
+# matches the code, startup skips the DDL
+class SchemaVersion(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    fingerprint: str = Field(max_length=64)
+    applied_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+# EMAIL OUTBOX
+class EmailOutbox(SQLModel, table=True):
+    __table_args__ = (Index("ix_emailoutbox_status_next_attempt", "status", "next_attempt_at"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    email_to: str = Field(max_length=255)
+    subject: str
+    html_content: str
+    status: str = Field(default="pending", regex="^(pending|sending|sent|failed)$")
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    claimed_at: Optional[datetime] = None
+    sent_at: Optional[datetime] = None
+    last_error: Optional[str] = None
 
 # EVENTS
 class Event(SQLModel, table=True):
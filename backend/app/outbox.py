@@ -0,0 +1,160 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, and_, or_, select, update
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import EmailOutbox
+from app.utils import EmailData, send_email
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_wakeup = threading.Event()
+_stopping = threading.Event()
+_workers: list[threading.Thread] = []
+
+
+def enqueue_email(*, session: Session, email_to: str, email_data: EmailData) -> EmailOutbox:
+    """
+    Queue an email for background delivery.
+
+    The row is only added to the session, so it is committed (or rolled back)
+    together with whatever the caller is writing. Call notify_outbox() after
+    the commit to have a worker pick it up immediately.
+    """
+    message = EmailOutbox(
+        email_to=email_to,
+        subject=email_data.subject,
+        html_content=email_data.html_content,
+    )
+    session.add(message)
+    return message
+
+
+def notify_outbox() -> None:
+    _wakeup.set()
+
+
+def _claimable(now: datetime):
+    stale = now - timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT_SECONDS)
+    return or_(
+        and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == "sending", EmailOutbox.claimed_at < stale),
+    )
+
+
+def _claim_batch(session: Session, batch_size: int) -> list[EmailOutbox]:
+    # the conditional UPDATE is what makes a claim exclusive: if another worker
+    # (or another process) got to a row first it no longer matches _claimable
+    now = datetime.now(timezone.utc)
+    candidates = session.exec(
+        select(EmailOutbox.id)
+        .where(_claimable(now))
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(batch_size)
+    ).all()
+    if not candidates:
+        return []
+    claimed_ids = session.exec(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(candidates), _claimable(now))
+        .values(status="sending", claimed_at=now, attempts=EmailOutbox.attempts + 1)
+        .returning(EmailOutbox.id)
+    ).scalars().all()
+    session.commit()
+    if not claimed_ids:
+        return []
+    return list(
+        session.exec(select(EmailOutbox).where(EmailOutbox.id.in_(claimed_ids))).all()
+    )
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def process_outbox_batch(batch_size: int | None = None) -> int:
+    """
+    Claim and deliver one batch of due emails. Returns how many were claimed.
+    """
+    with Session(engine, expire_on_commit=False) as session:
+        messages = _claim_batch(session, batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+        for message in messages:
+            try:
+                send_email(
+                    email_to=message.email_to,
+                    subject=message.subject,
+                    html_content=message.html_content,
+                )
+            except Exception as e:
+                logger.warning(f"sending outbox email {message.id} failed: {e!r}")
+                message.last_error = repr(e)[:1000]
+                if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    message.status = "failed"
+                else:
+                    message.status = "pending"
+                    message.next_attempt_at = datetime.now(timezone.utc) + _retry_delay(
+                        message.attempts
+                    )
+            else:
+                message.status = "sent"
+                message.sent_at = datetime.now(timezone.utc)
+                message.last_error = None
+            session.add(message)
+            session.commit()
+        return len(messages)
+
+
+def drain_outbox() -> int:
+    """
+    Deliver everything that is currently due, returning the number of claims.
+    """
+    total = 0
+    while True:
+        processed = process_outbox_batch()
+        if not processed:
+            return total
+        total += processed
+
+
+def _worker_loop() -> None:
+    while not _stopping.is_set():
+        _wakeup.clear()
+        try:
+            drain_outbox()
+        except Exception:
+            logger.exception("email outbox worker failed")
+        _wakeup.wait(settings.EMAIL_OUTBOX_POLL_SECONDS)
+
+
+def start_outbox_workers() -> None:
+    if _workers or not settings.emails_enabled:
+        return
+    _stopping.clear()
+    for i in range(settings.EMAIL_OUTBOX_WORKERS):
+        worker = threading.Thread(
+            target=_worker_loop, name=f"email-outbox-{i}", daemon=True
+        )
+        worker.start()
+        _workers.append(worker)
+
+
+def stop_outbox_workers(timeout: float = 10.0) -> None:
+    _stopping.set()
+    _wakeup.set()
+    for worker in _workers:
+        worker.join(timeout)
+    _workers.clear()
+
+
+def main() -> None:
+    logger.info("Draining email outbox")
+    processed = drain_outbox()
+    logger.info(f"Processed {processed} outbox emails")
+
+
+if __name__ == "__main__":
+    main()
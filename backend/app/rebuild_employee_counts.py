@@ -0,0 +1,20 @@
+import logging
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logger.info("Rebuilding company employee counts")
+    with Session(engine) as session:
+        crud.rebuild_employee_counts(session=session)
+    logger.info("Company employee counts rebuilt")
+
+
+if __name__ == "__main__":
+    main()
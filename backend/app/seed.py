@@ -0,0 +1,310 @@
+import argparse
+import bisect
+import logging
+import random
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, islice
+from typing import Any
+
+from sqlmodel import Session, SQLModel, func, insert, select, text
+
+from app import crud
+from app.core.db import engine, init_db
+from app.core.search import rebuild_user_search, suspend_user_search
+from app.core.security import get_password_hash
+from app.models import (
+    Company,
+    CompletedRequest,
+    Email,
+    Employment,
+    Interview,
+    Request,
+    User,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# every seeded user can log in as user<id>@example.com with this password
+SEED_PASSWORD = "seedpassword"
+
+FIRST_NAMES = (
+    "Alex", "Priya", "Jordan", "Wei", "Sam", "Maria", "Chris", "Aisha", "Taylor", "Noah",
+    "Emma", "Omar", "Liam", "Sofia", "Ethan", "Mei", "Lucas", "Zara", "Ryan", "Ana",
+)
+LAST_NAMES = (
+    "Smith", "Patel", "Chen", "Garcia", "Kim", "Nguyen", "Johnson", "Lee", "Brown", "Singh",
+    "Martinez", "Wang", "Davis", "Khan", "Lopez", "Miller", "Wilson", "Ali", "Moore", "Park",
+)
+ROLES = (
+    "Software Engineer", "Senior Software Engineer", "Data Scientist", "Product Manager",
+    "Machine Learning Engineer", "Site Reliability Engineer", "Engineering Manager",
+    "Security Engineer", "Research Scientist", "Frontend Engineer",
+)
+STUDENT_ROLES = ("Software Engineering Intern", "Data Science Intern", "Research Assistant")
+COMPANY_WORDS = (
+    "Data", "Cloud", "Quantum", "Blue", "Summit", "River", "Signal", "Bright", "Atlas", "Nova",
+    "Pixel", "Forge", "Harbor", "Vector", "Granite", "Lumen", "Orbit", "Cedar", "Echo", "Prime",
+)
+COMPANY_SUFFIXES = ("Labs", "Systems", "Technologies", "Software", "Networks", "AI", "Health", "Financial")
+# (location, relative share of users)
+LOCATIONS = (
+    ("Pittsburgh, PA", 30), ("New York, NY", 18), ("San Francisco, CA", 14), ("Seattle, WA", 10),
+    ("Washington, DC", 6), ("Boston, MA", 6), ("Chicago, IL", 5), ("Austin, TX", 5),
+    ("Philadelphia, PA", 4), ("Remote", 2),
+)
+
+
+class _Picker:
+    """
+    Weighted random choice by bisecting cumulative weights, which beats
+    calling random.choices once per row.
+    """
+
+    def __init__(self, rng: random.Random, values: list[Any], weights: list[float]) -> None:
+        self._rng = rng
+        self._values = values
+        self._cumulative = list(accumulate(weights))
+
+    def __call__(self) -> Any:
+        position = self._rng.random() * self._cumulative[-1]
+        return self._values[bisect.bisect_right(self._cumulative, position)]
+
+
+def _chunks(rows: Iterator[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def _bulk_insert(session: Session, model: type[SQLModel], rows: Iterator[dict[str, Any]], chunk_size: int) -> int:
+    # one executemany and one commit per chunk, so a large seed never holds
+    # a huge transaction open. Inserting into the table rather than the
+    # model skips the ORM's per-row bookkeeping.
+    inserted = 0
+    for chunk in _chunks(rows, chunk_size):
+        session.exec(insert(model.__table__), params=chunk)
+        session.commit()
+        inserted += len(chunk)
+    return inserted
+
+
+def _company_names(rng: random.Random, count: int) -> list[str]:
+    names: list[str] = []
+    seen: set[str] = set()
+    while len(names) < count:
+        name = f"{rng.choice(COMPANY_WORDS)}{rng.choice(COMPANY_WORDS).lower()} {rng.choice(COMPANY_SUFFIXES)}"
+        if name in seen:
+            name = f"{name} {len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def seed(
+    session: Session,
+    *,
+    users: int,
+    connections: int | None = None,
+    companies: int | None = None,
+    pending_share: float = 0.3,
+    chunk_size: int = 5000,
+    random_seed: int = 0,
+) -> dict[str, int]:
+    """
+    Add `users` synthetic alumni and students to the database, with their
+    emails, employment history, interviews and `connections` connection
+    rows (five per user by default), `pending_share` of them still pending.
+
+    Company sizes follow a Zipf-like curve and connections attach
+    preferentially, so a few companies and users are much bigger than the
+    rest, as in the real directory. Every user shares one pre-hashed
+    password (SEED_PASSWORD). Returns the number of rows added per table.
+    """
+    rng = random.Random(random_seed)
+    connections = users * 5 if connections is None else connections
+    company_count = companies or max(users // 50, 20)
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    this_year = now.year
+    hashed_password = get_password_hash(SEED_PASSWORD)
+    first_user_id = (session.exec(select(func.max(User.id))).one() or 0) + 1
+    user_ids = range(first_user_id, first_user_id + users)
+
+    # names from an earlier run with the same seed already exist; they are
+    # still picked from, only the new ones are inserted
+    company_names = _company_names(rng, company_count)
+    existing = set(session.exec(select(Company.name)).all())
+    new_company_names = [name for name in company_names if name not in existing]
+    pick_company = _Picker(rng, company_names, [1 / (rank + 1) ** 1.1 for rank in range(len(company_names))])
+    pick_location = _Picker(rng, [name for name, _ in LOCATIONS], [share for _, share in LOCATIONS])
+    # more recent classes are bigger
+    years = list(range(this_year - 25, this_year + 5))
+    pick_year = _Picker(rng, years, [1 + index for index in range(len(years))])
+
+    graduation_years: dict[int, int] = {}
+
+    def user_rows() -> Iterator[dict[str, Any]]:
+        for user_id in user_ids:
+            year = pick_year()
+            graduation_years[user_id] = year
+            is_alumni = year < this_year
+            company = pick_company() if rng.random() < (0.85 if is_alumni else 0.3) else None
+            role = rng.choice(ROLES if is_alumni else STUDENT_ROLES) if company else None
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            created_at = now - timedelta(days=rng.randint(0, 3 * 365))
+            yield {
+                "id": user_id,
+                "email": f"user{user_id}@example.com",
+                "is_active": True,
+                "is_superuser": False,
+                "full_name": f"{first} {last}",
+                "hashed_password": hashed_password,
+                "created_at": created_at,
+                "updated_at": created_at,
+                "location": pick_location(),
+                "graduation_year": year,
+                "linkedin_url": f"https://www.linkedin.com/in/{first.lower()}-{last.lower()}-{user_id}"
+                if rng.random() < 0.6 else None,
+                "personal_website": None,
+                "current_company": company,
+                "current_role": role,
+                "profile_image": None,
+                "open_to_coffee_chats": rng.random() < 0.4,
+                "open_to_mentorship": is_alumni and rng.random() < 0.3,
+                "available_for_referrals": company is not None and rng.random() < 0.25,
+                "bio": f"{role} at {company}." if company and rng.random() < 0.5 else None,
+                "is_alumni": is_alumni,
+                "profile_completed": rng.random() < 0.7,
+                "profile_visible": rng.random() < 0.95,
+            }
+
+    def email_rows() -> Iterator[dict[str, Any]]:
+        for user_id in user_ids:
+            yield {"email": f"user{user_id}@example.com", "preferred": True, "user_id": user_id}
+            if rng.random() < 0.2:
+                yield {"email": f"user{user_id}@alumni.example.edu", "preferred": False, "user_id": user_id}
+
+    def employment_rows() -> Iterator[dict[str, Any]]:
+        for user_id in user_ids:
+            year = graduation_years[user_id]
+            for _ in range(rng.choices((0, 1, 2, 3), weights=(2, 4, 3, 1))[0]):
+                internship = rng.random() < 0.6
+                start = datetime(rng.randint(year - 4, min(year + 6, this_year)), rng.choice((1, 6, 9)), 1)
+                end = start + timedelta(weeks=12) if internship else None
+                if start > now:
+                    continue
+                yield {
+                    "user_id": user_id,
+                    "company_name": pick_company(),
+                    "type": "internship" if internship else "full time",
+                    "start": start,
+                    "end": end,
+                }
+
+    def interview_rows() -> Iterator[dict[str, Any]]:
+        for user_id in user_ids:
+            year = graduation_years[user_id]
+            for _ in range(rng.choices((0, 1, 2, 4), weights=(4, 3, 2, 1))[0]):
+                season = datetime(rng.randint(year - 4, min(year, this_year)), rng.choice((1, 9)), 1)
+                yield {
+                    "user_id": user_id,
+                    "company_name": pick_company(),
+                    "role": rng.choice(ROLES + STUDENT_ROLES),
+                    "internship": season.year < year,
+                    "season": season,
+                    "passed": rng.random() < 0.35,
+                    "note": None,
+                    "date": season + timedelta(days=rng.randint(0, 60)),
+                }
+
+    # preferential attachment: half the time link to the endpoint of an
+    # existing connection, which favours users who are already well connected
+    pairs: set[tuple[int, int]] = set()
+    endpoints: list[int] = []
+    attempts = 0
+    target = min(connections, users * (users - 1) // 4)
+    while len(pairs) < target and attempts < target * 4:
+        attempts += 1
+        a = rng.choice(user_ids)
+        b = rng.choice(endpoints) if endpoints and rng.random() < 0.5 else rng.choice(user_ids)
+        pair = (min(a, b), max(a, b))
+        if a == b or pair in pairs:
+            continue
+        pairs.add(pair)
+        endpoints += pair
+
+    ordered = sorted(pairs)
+    rng.shuffle(ordered)
+    pending_count = int(len(ordered) * pending_share)
+
+    def connection_rows(chosen: list[tuple[int, int]], pending: bool) -> Iterator[dict[str, Any]]:
+        for a, b in chosen:
+            requester, requested = (a, b) if rng.random() < 0.5 else (b, a)
+            row = {
+                "created_at": now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)),
+                "requester_id": requester,
+                "requested_id": requested,
+            }
+            if pending:
+                row["message"] = "Would love to connect!" if rng.random() < 0.5 else None
+            yield row
+
+    counts: dict[str, int] = {}
+    suspend_user_search(session.connection())
+    session.commit()
+    try:
+        counts["company"] = _bulk_insert(session, Company, ({"name": name} for name in new_company_names), chunk_size)
+        counts["user"] = _bulk_insert(session, User, user_rows(), chunk_size)
+        counts["email"] = _bulk_insert(session, Email, email_rows(), chunk_size)
+        counts["employment"] = _bulk_insert(session, Employment, employment_rows(), chunk_size)
+        counts["interview"] = _bulk_insert(session, Interview, interview_rows(), chunk_size)
+        counts["request"] = _bulk_insert(
+            session, Request, connection_rows(ordered[:pending_count], True), chunk_size
+        )
+        counts["completedrequest"] = _bulk_insert(
+            session, CompletedRequest, connection_rows(ordered[pending_count:], False), chunk_size
+        )
+    finally:
+        rebuild_user_search(session.connection())
+        session.commit()
+
+    if session.get_bind().dialect.name == "postgresql":
+        # ids were assigned here, so move the sequence past them
+        session.exec(text("SELECT setval(pg_get_serial_sequence('\"user\"', 'id'), (SELECT max(id) FROM \"user\"))"))
+    crud.bump_table_version(session=session, table_name="company")
+    crud.rebuild_employee_counts(session=session)
+    session.exec(text("ANALYZE"))
+    session.commit()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic users for scale testing.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--connections", type=int, help="connection rows, default five per user")
+    parser.add_argument("--companies", type=int, help="default one per 50 users")
+    parser.add_argument("--pending-share", type=float, default=0.3)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logger.info(f"Seeding {args.users} users")
+    started = time.perf_counter()
+    with Session(engine) as session:
+        init_db(session)
+        counts = seed(
+            session,
+            users=args.users,
+            connections=args.connections,
+            companies=args.companies,
+            pending_share=args.pending_share,
+            chunk_size=args.chunk_size,
+            random_seed=args.seed,
+        )
+    summary = ", ".join(f"{count} {table}" for table, count in counts.items())
+    logger.info(f"Seeded {summary} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
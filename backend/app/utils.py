@@ -4,9 +4,8 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
-import emails  # type: ignore
 import jwt
-from jinja2 import Template
+from jinja2 import Environment, FileSystemLoader
 from jwt.exceptions import InvalidTokenError
 
 from app.core import security
@@ -22,11 +21,24 @@ class EmailData:
     subject: str
 
 
+EMAIL_TEMPLATES_DIR = Path(__file__).parent / "email_templates" / "build"
+
+# compiled templates are cached by name; with auto_reload jinja stats the file
+# on lookup and recompiles only when its mtime changed
+email_template_env = Environment(
+    loader=FileSystemLoader(EMAIL_TEMPLATES_DIR),
+    auto_reload=True,
+    cache_size=-1,
+)
+
+
+def preload_email_templates() -> None:
+    for template_name in email_template_env.list_templates(extensions=["html"]):
+        email_template_env.get_template(template_name)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email_templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
+    html_content = email_template_env.get_template(template_name).render(context)
     return html_content
 
 
@@ -37,6 +49,10 @@ def send_email(
     html_content: str = "",
 ) -> None:
     assert settings.emails_enabled, "no provided configuration for email variables"
+    # emails pulls in requests, lxml and cssutils; only the processes that
+    # actually send mail (the outbox workers) should pay for importing them
+    import emails  # type: ignore
+
     message = emails.Message(
         subject=subject,
         html=html_content,
@@ -148,6 +164,43 @@ def generate_connection_request_email(
     return EmailData(html_content=html_content, subject=subject)
 
 
+def generate_connection_digest_email(
+    email_to: str,
+    requested_name: str,
+    requests: list[dict[str, Any]],
+) -> EmailData:
+    """
+    One email listing several pending requests. Each item of `requests` has
+    request_id, requester_name, requester_title, requester_company,
+    requester_graduation_year and message.
+    """
+    project_name = settings.PROJECT_NAME
+    count = len(requests)
+    noun = "request" if count == 1 else "requests"
+    subject = f"{project_name} - You have {count} new connection {noun}"
+    html_content = render_email_template(
+        template_name="connection_digest.html",
+        context={
+            "project_name": settings.PROJECT_NAME,
+            "requested_name": requested_name,
+            "request_count": count,
+            "requests": [
+                {
+                    **request,
+                    "requester_title": request["requester_title"] or "",
+                    "requester_company": request["requester_company"] or "",
+                    "requester_graduation_year": request["requester_graduation_year"] or "",
+                    "accept_link": f"{settings.FRONTEND_HOST}/connections/accept/{request['request_id']}",
+                    "ignore_link": f"{settings.FRONTEND_HOST}/connections/ignore/{request['request_id']}",
+                }
+                for request in requests
+            ],
+            "link": f"{settings.FRONTEND_HOST}/connections",
+        },
+    )
+    return EmailData(html_content=html_content, subject=subject)
+
+
 def generate_connection_acceptance_email(
     email_to: str,
     requester_name: str,
@@ -0,0 +1,320 @@
+"""
+End-to-end load test against a seeded large database.
+
+    cd backend && python scripts/bench_load.py --users 50000 --connections 500000
+    cd backend && python scripts/bench_load.py --mode uvicorn --save-baseline
+
+Seeds a throwaway SQLite database with app.seed, then drives the app through each
+scenario below, in-process over the ASGI transport, through a local
+uvicorn server, or both. Every scenario sends --requests requests,
+--concurrency at a time, and reports p50/p95/p99 latency and throughput.
+
+Results are compared with the baselines stored in --baseline for the same
+mode and database size; the script exits non-zero if a scenario's p95 or
+throughput is more than --tolerance worse. --save-baseline records the run
+as the new baseline instead.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "bench_load_baselines.json"
+INTERVIEWS_PER_BULK = 20
+SCENARIOS = (
+    "login",
+    "users",
+    "employee_counts",
+    "connections_create",
+    "connections_accept",
+    "interviews_bulk",
+)
+
+
+def percentile(quantiles: list[float], p: int) -> float:
+    return quantiles[p - 1] * 1000
+
+
+async def run_scenario(
+    send: Callable[[int], Awaitable["httpx.Response"]], requests: int, concurrency: int
+) -> dict:
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await send(i)
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else [0.0] * 99
+    return {
+        "p50_ms": percentile(quantiles, 50),
+        "p95_ms": percentile(quantiles, 95),
+        "p99_ms": percentile(quantiles, 99),
+        "requests_per_second": requests / elapsed,
+        "errors": errors,
+    }
+
+
+async def run_mode(client: "httpx.AsyncClient", context: dict, args: argparse.Namespace) -> dict:
+    from app.core.security import create_access_token
+    from app.seed import SEED_PASSWORD
+
+    rng = random.Random(f"{args.users}-{context['runs']}")
+    context["runs"] += 1
+    user_ids = context["user_ids"]
+    connected = context["connected"]
+
+    def headers(user_id: int) -> dict:
+        token = create_access_token(user_id, timedelta(minutes=30))
+        return {"Authorization": f"Bearer {token}"}
+
+    # pairs not connected yet, so the connection scenarios never hit the
+    # "already requested" checks; recorded so the next mode picks new ones
+    pairs = []
+    while len(pairs) < args.requests:
+        a, b = rng.sample(user_ids, 2)
+        if (min(a, b), max(a, b)) not in connected:
+            connected.add((min(a, b), max(a, b)))
+            pairs.append((a, b))
+    readers = [rng.choice(user_ids) for _ in range(args.requests)]
+    reader_headers = {user_id: headers(user_id) for user_id in set(readers)}
+    companies = context["companies"]
+    created: list[tuple[int, int]] = []
+
+    async def login(i: int):
+        form = {"username": f"user{readers[i]}@example.com", "password": SEED_PASSWORD}
+        return await client.post("/api/v1/login/access-token", data=form)
+
+    async def users(i: int):
+        return await client.get("/api/v1/users/", headers=reader_headers[readers[i]])
+
+    async def employee_counts(i: int):
+        return await client.get("/api/v1/companies/employee_counts", headers=reader_headers[readers[i]])
+
+    async def connections_create(i: int):
+        requester, requested = pairs[i]
+        response = await client.post(
+            "/api/v1/connections/",
+            headers=headers(requester),
+            json={"requester_id": requester, "requested_id": requested, "message": "Hi!"},
+        )
+        if response.status_code == 200:
+            created.append((response.json()["id"], requested))
+        return response
+
+    async def connections_accept(i: int):
+        request_id, requested = created[i]
+        return await client.post(f"/api/v1/connections/accept/{request_id}", headers=headers(requested))
+
+    async def interviews_bulk(i: int):
+        interviews = [
+            {
+                "user_id": readers[i],
+                "company_name": rng.choice(companies),
+                "role": "Software Engineer",
+                "internship": True,
+                "season": "2025-09-01T00:00:00",
+                "passed": True,
+                "note": None,
+                "date": None,
+            }
+            for _ in range(INTERVIEWS_PER_BULK)
+        ]
+        return await client.post(
+            "/api/v1/interviews/bulk",
+            headers=reader_headers[readers[i]],
+            json={"data": interviews, "count": len(interviews)},
+        )
+
+    senders = {
+        "login": login,
+        "users": users,
+        "employee_counts": employee_counts,
+        "connections_create": connections_create,
+        "connections_accept": connections_accept,
+        "interviews_bulk": interviews_bulk,
+    }
+    results = {}
+    for name in args.scenarios:
+        requests = len(created) if name == "connections_accept" else args.requests
+        if not requests:
+            continue
+        results[name] = await run_scenario(senders[name], requests, args.concurrency)
+        print(f"  {name}: {results[name]['requests_per_second']:.1f} req/s", file=sys.stderr)
+    return results
+
+
+async def run_asgi(context: dict, args: argparse.Namespace) -> dict:
+    import httpx
+
+    from app.main import app
+
+    # count an exception in a route as a failed request instead of
+    # aborting the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        return await run_mode(client, context, args)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(context: dict, args: argparse.Namespace) -> dict:
+    import httpx
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+    )
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    (await client.get("/api/v1/utils/health-check/")).raise_for_status()
+                    break
+                except httpx.HTTPError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError("uvicorn did not start")
+                    await asyncio.sleep(0.2)
+            return await run_mode(client, context, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> int:
+    regressions = 0
+    print(f"{'mode':<9}{'scenario':<20}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'req/s':>9}{'errors':>8}  vs baseline")
+    for mode, scenarios in results.items():
+        for name, result in scenarios.items():
+            previous = baseline.get(mode, {}).get(name)
+            note = "no baseline"
+            if previous:
+                p95_change = result["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0.0
+                rps_change = result["requests_per_second"] / previous["requests_per_second"] - 1
+                note = f"p95 {p95_change:+.0%}, req/s {rps_change:+.0%}"
+                if p95_change > tolerance or rps_change < -tolerance:
+                    regressions += 1
+                    note += "  REGRESSION"
+            print(
+                f"{mode:<9}{name:<20}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+                f"{result['p99_ms']:>9.1f}{result['requests_per_second']:>9.1f}"
+                f"{result['errors']:>8}  {note}"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--connections", type=int, default=500000)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mode", choices=["asgi", "uvicorn", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(
+            SQLITE_DB=f"sqlite:///{tmp}/load.db",
+            ENVIRONMENT="local",
+            SMTP_HOST="",
+        )
+        # tokens minted here must be accepted by the uvicorn process too
+        os.environ.setdefault("SECRET_KEY", "bench-load-secret-key")
+        os.environ.setdefault("FIRST_SUPERUSER", "admin@example.com")
+        os.environ.setdefault("FIRST_SUPERUSER_PASSWORD", "adminpassword")
+        os.environ.setdefault("FIRST_SUPERUSER_NAME", "Admin")
+        sys.path.insert(0, str(BACKEND_DIR))
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        from sqlmodel import Session, select
+
+        from app.core.db import engine, init_db
+        from app.core.security import shutdown_password_hash_pool
+        from app.models import Company, CompletedRequest, Request, User
+        from app.seed import seed
+
+        started = time.perf_counter()
+        with Session(engine) as session:
+            init_db(session)
+            seed(session, users=args.users, connections=args.connections)
+            user_ids = list(session.exec(select(User.id).where(User.is_superuser == False)).all())
+            companies = list(session.exec(select(Company.name)).all())
+            connected = {
+                (min(a, b), max(a, b))
+                for model in (Request, CompletedRequest)
+                for a, b in session.exec(select(model.requester_id, model.requested_id)).all()
+            }
+        print(f"seeded {args.users} users, {len(connected)} connections "
+              f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        context = {
+            "user_ids": user_ids,
+            "companies": companies,
+            "connected": connected,
+            "runs": 0,
+        }
+        results = {}
+        for mode in (["asgi", "uvicorn"] if args.mode == "both" else [args.mode]):
+            print(f"running {mode}", file=sys.stderr)
+            runner = run_asgi if mode == "asgi" else run_uvicorn
+            results[mode] = asyncio.run(runner(context, args))
+        shutdown_password_hash_pool()
+        engine.dispose()
+
+    # baselines only compare like with like
+    key = f"users={args.users} connections={args.connections} requests={args.requests} concurrency={args.concurrency}"
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressions = compare(results, stored.get(key, {}), args.tolerance)
+    if args.save_baseline:
+        stored[key] = {**stored.get(key, {}), **results}
+        args.baseline.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{regressions} scenarios regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Login throughput benchmark.
+
+    cd backend && python scripts/bench_login.py --requests 200 --concurrency 50
+
+Runs the same login burst twice, each in a fresh interpreter against a
+throwaway SQLite database: once hashing inline (PASSWORD_HASH_WORKERS=0) and
+once through the bcrypt process pool. While the burst runs, /users/me is
+polled to show how much the logins slow down the rest of the API.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+EMAIL = "bench@example.com"
+PASSWORD = "benchpassword"
+
+
+async def run_burst(requests: int, concurrency: int) -> dict:
+    import httpx
+
+    from app.initial_data import init
+    from app.main import app
+
+    init()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post(
+            "/api/v1/users/signup",
+            json={"email": EMAIL, "password": PASSWORD, "full_name": "Bench"},
+        )
+        login = {"username": EMAIL, "password": PASSWORD}
+        token = (await client.post("/api/v1/login/access-token", data=login)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        semaphore = asyncio.Semaphore(concurrency)
+        done = asyncio.Event()
+
+        async def one_login() -> None:
+            async with semaphore:
+                response = await client.post("/api/v1/login/access-token", data=login)
+                response.raise_for_status()
+
+        async def probe() -> list[float]:
+            latencies = []
+            while not done.is_set():
+                start = time.perf_counter()
+                (await client.get("/api/v1/users/me", headers=headers)).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+            return latencies
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(one_login() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        probe_latencies = await probe_task
+
+    probe_latencies.sort()
+    return {
+        "logins_per_second": requests / elapsed,
+        "elapsed_seconds": elapsed,
+        "probe_p50_ms": statistics.median(probe_latencies) * 1000,
+        "probe_p95_ms": probe_latencies[int(len(probe_latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def run_variant(name: str, workers: str, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "SQLITE_DB": f"sqlite:///{tmp}/bench.db",
+            "PASSWORD_HASH_WORKERS": workers,
+            "FIRST_SUPERUSER": os.environ.get("FIRST_SUPERUSER", "admin@example.com"),
+            "FIRST_SUPERUSER_PASSWORD": os.environ.get("FIRST_SUPERUSER_PASSWORD", "adminpassword"),
+            "FIRST_SUPERUSER_NAME": os.environ.get("FIRST_SUPERUSER_NAME", "Admin"),
+            "SMTP_HOST": "",
+        }
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency)],
+            cwd=BACKEND_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["variant"] = name
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, str(BACKEND_DIR))
+        print(json.dumps(asyncio.run(run_burst(args.requests, args.concurrency))))
+        return
+
+    results = [
+        run_variant("inline", "0", args),
+        run_variant("process pool", str(os.cpu_count() or 1), args),
+    ]
+    print(f"{'variant':<14}{'logins/s':>10}{'elapsed s':>11}{'/me p50 ms':>12}{'/me p95 ms':>12}")
+    for result in results:
+        print(
+            f"{result['variant']:<14}{result['logins_per_second']:>10.1f}"
+            f"{result['elapsed_seconds']:>11.2f}{result['probe_p50_ms']:>12.1f}"
+            f"{result['probe_p95_ms']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Import time budget for the API.
+
+    cd backend && python scripts/check_import_time.py --max-ratio 2.25
+
+Imports app.main in fresh interpreters with `python -X importtime`, keeps
+the fastest of --runs runs and prints the slowest modules in it. Exits
+non-zero if importing the app loaded a module that is meant to be imported
+only when it is used, like the email stack behind app.utils.send_email, or
+if the import went over budget.
+
+The budget is relative to `import fastapi, sqlmodel` timed the same way in
+the same run, so it holds on fast and slow machines alike: app.main may take
+at most --max-ratio times as long. --budget-ms adds an absolute limit for a
+known machine.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# packages that must not load just because the app was imported
+LAZY_PACKAGES = ("emails", "lxml", "premailer", "cssutils", "requests", "redis", "mjml")
+
+
+# the framework the app is built on, timed as the baseline for the budget
+BASELINE_MODULES = ("fastapi", "sqlmodel")
+
+
+def import_times(modules: tuple[str, ...] = ("app.main",)) -> list[tuple[str, int, int]]:
+    """
+    (module, self microseconds, cumulative microseconds) for every module
+    imported by importing `modules`, in import order.
+    """
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(BACKEND_DIR),
+        "FIRST_SUPERUSER": os.environ.get("FIRST_SUPERUSER", "admin@example.com"),
+        "FIRST_SUPERUSER_PASSWORD": os.environ.get("FIRST_SUPERUSER_PASSWORD", "adminpassword"),
+        "FIRST_SUPERUSER_NAME": os.environ.get("FIRST_SUPERUSER_NAME", "Admin"),
+    }
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def _total_us(modules: list[tuple[str, int, int]], names: tuple[str, ...] = ("app.main",)) -> int:
+    return sum(total for name, _, total in modules if name in names)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-ratio", type=float, default=2.25)
+    parser.add_argument("--budget-ms", type=float, help="absolute limit, off by default")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    modules = min(runs, key=_total_us)
+    total_ms = _total_us(modules) / 1000
+    baseline_ms = min(
+        _total_us(import_times(BASELINE_MODULES), BASELINE_MODULES) for _ in range(args.runs)
+    ) / 1000
+    ratio = total_ms / baseline_ms
+
+    print(f"{'self ms':>9}{'total ms':>10}  module")
+    for name, self_us, cumulative_us in sorted(modules, key=lambda module: module[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f}{cumulative_us / 1000:>10.1f}  {name}")
+
+    failures = []
+    eager = sorted({name.split(".")[0] for name, _, _ in modules} & set(LAZY_PACKAGES))
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    if ratio > args.max_ratio:
+        failures.append(
+            f"import app.main took {ratio:.2f}x as long as import {', '.join(BASELINE_MODULES)}, "
+            f"budget is {args.max_ratio:.2f}x"
+        )
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        failures.append(f"import app.main took {total_ms:.0f}ms, budget is {args.budget_ms:.0f}ms")
+    print(
+        f"\nimport app.main: {total_ms:.0f}ms, import {', '.join(BASELINE_MODULES)}: "
+        f"{baseline_ms:.0f}ms (best of {args.runs}), {ratio:.2f}x, budget {args.max_ratio:.2f}x"
+    )
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Query plan regression check for the hot lookup routes.
+
+    cd backend && python scripts/check_query_plans.py --users 20000
+
+Seeds a throwaway SQLite database, calls the routes in requests.py,
+emails.py, companies.py and users.py through the app, captures every
+statement they run and asks SQLite for its plan with EXPLAIN QUERY PLAN.
+Exits non-zero if any statement scans a whole table instead of using an
+index, apart from the few that are full scans by design.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# statements that read a whole table on purpose (prefix match on the SQL)
+EXPECTED_SCANS = (
+    "SELECT count(*) AS count_1 \nFROM company",
+    "SELECT count(*) AS count_1 \nFROM user \nWHERE user.id != ?",
+)
+
+
+def check(users: int) -> int:
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlmodel import Session, func, select
+
+    from app.api.deps import invalidate_cached_user
+    from app.core.db import async_engine, engine
+    from app.core.security import create_access_token
+    from app.initial_data import init
+    from app.main import app
+    from app.models import Request, User
+    from app.seed import seed
+
+    init()
+    db_path = os.environ["SQLITE_DB"].removeprefix("sqlite:///")
+    with Session(engine) as session:
+        seed(session, users=users)
+        # the signed in user is one with a pending request to accept
+        pending = session.exec(select(Request).order_by(Request.id)).first()
+        me = pending.requested_id
+        company = session.exec(
+            select(User.current_company)
+            .where(User.current_company.is_not(None))
+            .group_by(User.current_company)
+            .order_by(func.count().desc())
+        ).first()
+        other = session.exec(select(func.max(User.id))).one()
+
+    headers = {"Authorization": f"Bearer {create_access_token(me, timedelta(minutes=5))}"}
+    calls = [
+        ("GET", "/api/v1/users/"),
+        ("GET", "/api/v1/users/me"),
+        ("GET", f"/api/v1/users/company/{company}"),
+        ("GET", "/api/v1/companies/"),
+        ("GET", "/api/v1/companies/employee_counts"),
+        ("GET", f"/api/v1/companies/{company}"),
+        ("GET", f"/api/v1/companies/all_employees/{company}"),
+        ("GET", f"/api/v1/companies/current_employees/{company}"),
+        ("GET", f"/api/v1/connections/{me}/accepted_requests"),
+        ("GET", f"/api/v1/connections/{me}/accepted_requested"),
+        ("POST", "/api/v1/connections/", {"requester_id": me, "requested_id": other, "message": None}),
+        ("POST", "/api/v1/emails/me", {"email": "second@example.com", "preferred": True}),
+        ("PATCH", "/api/v1/emails/me/preferred", {"email": f"user{me}@example.com", "preferred": True}),
+        ("POST", f"/api/v1/connections/accept/{pending.id}"),
+    ]
+
+    captured: list[tuple[str, str, object]] = []
+    current = {"route": ""}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((current["route"], statement, parameters))
+
+    # the async routes run their statements through async_engine
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", capture)
+    client = TestClient(app)
+    for method, path, *body in calls:
+        current["route"] = f"{method} {path}"
+        invalidate_cached_user(me)
+        response = client.request(method, path, headers=headers, json=body[0] if body else None)
+        if response.status_code >= 400:
+            print(f"warning: {method} {path} returned {response.status_code}")
+    for target in engines:
+        event.remove(target, "before_cursor_execute", capture)
+
+    connection = sqlite3.connect(db_path)
+    failures = 0
+    for route, statement, parameters in captured:
+        plan = connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        details = [row[-1] for row in plan]
+        scans = [
+            detail for detail in details
+            if detail.startswith("SCAN ") and "INDEX" not in detail and "VIRTUAL TABLE" not in detail
+            and not detail.startswith("SCAN CONSTANT ROW")
+        ]
+        expected = statement.startswith(EXPECTED_SCANS)
+        status = "ok" if not scans else "expected scan" if expected else "FULL SCAN"
+        if scans and not expected:
+            failures += 1
+        print(f"[{status}] {route}\n    {' '.join(statement.split())[:140]}\n    {' | '.join(details)}")
+    connection.close()
+    print(f"\n{len(captured)} statements checked, {failures} unexpected full scans")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(
+            SQLITE_DB=f"sqlite:///{tmp}/plans.db",
+            ENVIRONMENT="local",
+            PASSWORD_HASH_WORKERS="0",
+            SMTP_HOST="",
+        )
+        os.environ.setdefault("FIRST_SUPERUSER", "admin@example.com")
+        os.environ.setdefault("FIRST_SUPERUSER_PASSWORD", "adminpassword")
+        os.environ.setdefault("FIRST_SUPERUSER_NAME", "Admin")
+        sys.path.insert(0, str(BACKEND_DIR))
+        sys.exit(check(args.users))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
 #!/bin/bash
 set -e
 
+# init_db is a single query when the schema is current, and takes a lock
+# otherwise, so replicas can run this at the same time
 echo "Initializing database..."
 python -m app.initial_data
 
-echo "Starting application..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers 1
+# One worker unless WEB_CONCURRENCY says otherwise. Caches, the connection
+# graph and metrics are per process; see WEB_CONCURRENCY in app/core/config.py
+# for what changes with more than one worker.
+WORKERS="${WEB_CONCURRENCY:-1}"
+export WEB_CONCURRENCY="$WORKERS"
+
+echo "Starting application with $WORKERS workers..."
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers "$WORKERS"